@@ -13,6 +13,41 @@ from pathlib import Path
 import urllib.request
 import shutil
 
+# orjson parses the enriched dataset several times faster than stdlib json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def load_json_file(path):
+    """
+    Parse a JSON file, with orjson when available.
+    Files written by json.dump can hold NaN literals, which orjson rejects; those fall back to stdlib json.
+    """
+    with open(path, 'rb') as f:
+        raw = f.read()
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(raw)
+
+
+def save_json_file(path, data):
+    """
+    Write data as JSON, with orjson when available.
+    orjson writes NaN as null, so the file stays valid JSON for every reader.
+    """
+    if ORJSON_AVAILABLE:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY))
+        return
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
 
 def resolve_project_path(relative_path):
     """
@@ -102,10 +137,7 @@ def check_enriched_data_exists(output_file='data/enriched_spotify_data.json'):
         return False, None
 
     try:
-        with open(output_file, 'r') as f:
-            data = json.load(f)
-
-        df = pd.DataFrame(data)
+        df = pd.DataFrame(load_json_file(output_file))
         if 'ts' in df.columns:
             df['ts'] = pd.to_datetime(df['ts'], format='mixed')
             latest = df['ts'].max()
@@ -152,21 +184,28 @@ def build_enriched_data_from_raw(spotify_api=None, output_file='data/enriched_sp
 
         # Get unique artists
         if 'master_metadata_album_artist_name' in df.columns:
-            unique_artists = df['master_metadata_album_artist_name'].unique()
+            unique_artists = df['master_metadata_album_artist_name'].dropna().unique()
             print(f"🎤 Found {len(unique_artists)} unique artists")
 
-            # Fetch genres for each artist
-            for i, artist in enumerate(unique_artists):
-                if i % 100 == 0 and progress_callback:
-                    progress_callback(f"Enriching genres... {i}/{len(unique_artists)} artists")
+            # Fetch genres 100 artists at a time (searched concurrently), reporting progress in between
+            genre_map = {}
+            for start in range(0, len(unique_artists), 100):
+                if progress_callback:
+                    progress_callback(f"Enriching genres... {start}/{len(unique_artists)} artists")
 
+                chunk = unique_artists[start:start + 100]
                 try:
-                    genres = spotify_api.get_artist_genres(artist)
-                    df.loc[df['master_metadata_album_artist_name'] == artist, 'genres'] = \
-                        ', '.join(genres) if genres else 'Unknown'
+                    artist_genres = spotify_api.get_artists_genres(dict.fromkeys(chunk))
                 except Exception as e:
-                    print(f"⚠️  Error fetching genres for {artist}: {e}")
-                    df.loc[df['master_metadata_album_artist_name'] == artist, 'genres'] = 'Unknown'
+                    print(f"⚠️  Error fetching genres for artists {start}-{start + len(chunk)}: {e}")
+                    artist_genres = {}
+
+                for artist in chunk:
+                    genres = artist_genres.get(artist)
+                    genre_map[artist] = ', '.join(genres) if genres else 'Unknown'
+
+            # Assign all genres in one lookup pass instead of a full-column comparison per artist
+            df['genres'] = df['master_metadata_album_artist_name'].map(genre_map)
 
             # Save genre cache
             if hasattr(spotify_api, 'genre_cache'):
@@ -191,9 +230,7 @@ def build_enriched_data_from_raw(spotify_api=None, output_file='data/enriched_sp
         df['ts'] = df['ts'].astype(str)
 
     # Convert to JSON and save
-    data = df.to_dict('records')
-    with open(output_file, 'w') as f:
-        json.dump(data, f)
+    save_json_file(output_file, df.to_dict('records'))
 
     print(f"✅ Successfully created enriched dataset with {len(df)} records")
     print(f"{'='*60}\n")
@@ -251,8 +288,7 @@ def download_enriched_data_from_release(output_file='data/enriched_spotify_data.
 
         # Verify the downloaded file is valid JSON
         try:
-            with open(output_file, 'r') as f:
-                json.load(f)
+            load_json_file(output_file)
             print(f"✅ Verified: File is valid JSON")
             return True
         except json.JSONDecodeError as e:
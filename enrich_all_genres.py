@@ -43,7 +43,7 @@ def enrich_and_save(df, spotify_api, output_file='data/enriched_spotify_data.jso
     print(f"\n🎵 Starting genre enrichment for {len(df)} tracks...")
 
     # Get unique artists to minimize API calls
-    unique_artists = df['master_metadata_album_artist_name'].unique()
+    unique_artists = df['master_metadata_album_artist_name'].dropna().unique()
     print(f"Found {len(unique_artists)} unique artists")
 
     # Fetch genres for all unique artists
@@ -52,13 +52,10 @@ def enrich_and_save(df, spotify_api, output_file='data/enriched_spotify_data.jso
         if i % 50 == 0:  # Progress update every 50 artists
             print(f"Processing artist {i+1}/{len(unique_artists)}: {artist}")
 
+        # Cached artists return immediately; API calls are rate limited inside SpotifyAPI
         genres = spotify_api.get_artist_genres(artist)
         artist_genres_map[artist] = ', '.join(genres) if genres else 'Unknown'
 
-        # Small delay to avoid rate limiting
-        import time
-        time.sleep(0.1)
-
     print(f"✅ Fetched genres for {len(artist_genres_map)} artists")
 
     # Add genres to dataframe
@@ -7,6 +7,7 @@ class GenreCache:
     def __init__(self, cache_file='data/artist_genres_cache.json'):
         self.cache_file = cache_file
         self.cache = self.load_cache()
+        self.dirty = False  # Set by in-memory changes; save_cache only writes when True
 
     def load_cache(self):
         """Load genre cache from file"""
@@ -19,10 +20,13 @@ class GenreCache:
         return {}
 
     def save_cache(self):
-        """Save genre cache to file"""
+        """Save genre cache to file (no-op if nothing changed since the last save)"""
+        if not self.dirty:
+            return
         try:
             with open(self.cache_file, 'w', encoding='utf-8') as f:
                 json.dump(self.cache, f, indent=2, ensure_ascii=False)
+            self.dirty = False
         except Exception as e:
             print(f"Error saving cache: {e}")
 
@@ -31,11 +35,12 @@ class GenreCache:
         return self.cache.get(artist_name, None)
 
     def set_artist_genres(self, artist_name, genres):
-        """Set genres for an artist in cache"""
+        """Set genres for an artist in memory; persisted by the next save_cache()"""
         self.cache[artist_name] = {
             'genres': genres,
             'updated': datetime.now().isoformat()
         }
+        self.dirty = True
 
     def get_cache_stats(self):
         """Get statistics about the cache"""
@@ -60,5 +65,7 @@ class GenreCache:
 
         for artist in to_remove:
             del self.cache[artist]
+        if to_remove:
+            self.dirty = True
 
         return len(to_remove)
\ No newline at end of file
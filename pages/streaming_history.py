@@ -10,6 +10,14 @@ import sys
 sys.path.append('..')
 from spotify_api import SpotifyAPI
 from shared_components import render_footer
+from data_builder import load_json_file
+
+DAY_ORDER = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+def split_genres(genres):
+    """One genre per entry from comma-joined genre strings (row labels kept), skipping missing and 'Unknown'"""
+    listed = genres[genres.notna() & (genres != '') & (genres != 'Unknown')]
+    return listed.str.split(',').explode().str.strip()
 
 # Page config
 st.set_page_config(
@@ -54,15 +62,13 @@ def load_enriched_data():
 
     # Load the enriched data
     if os.path.exists(enriched_file):
-        with open(enriched_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        df = pd.DataFrame(data)
+        df = pd.DataFrame(load_json_file(enriched_file))
         df['ts'] = pd.to_datetime(df['ts'], format='mixed')
         df['date'] = df['ts'].dt.date
         df['year'] = df['ts'].dt.year
         df['month'] = df['ts'].dt.month
         df['hour'] = df['ts'].dt.hour
-        df['day_of_week'] = df['ts'].dt.day_name()
+        df['day_of_week'] = pd.Categorical.from_codes(df['ts'].dt.dayofweek, categories=DAY_ORDER, ordered=True)
         df['minutes_played'] = df['ms_played'] / 60000
         df['hours_played'] = df['minutes_played'] / 60
         return df
@@ -101,7 +107,7 @@ def load_spotify_data(use_api=False, _spotify_api=None):
         df['year'] = df['ts'].dt.year
         df['month'] = df['ts'].dt.month
         df['hour'] = df['ts'].dt.hour
-        df['day_of_week'] = df['ts'].dt.day_name()
+        df['day_of_week'] = pd.Categorical.from_codes(df['ts'].dt.dayofweek, categories=DAY_ORDER, ordered=True)
         df['minutes_played'] = df['ms_played'] / 60000
         df['hours_played'] = df['minutes_played'] / 60
 
@@ -126,7 +132,7 @@ def load_spotify_data(use_api=False, _spotify_api=None):
             recent_df['year'] = recent_df['ts'].dt.year
             recent_df['month'] = recent_df['ts'].dt.month
             recent_df['hour'] = recent_df['ts'].dt.hour
-            recent_df['day_of_week'] = recent_df['ts'].dt.day_name()
+            recent_df['day_of_week'] = pd.Categorical.from_codes(recent_df['ts'].dt.dayofweek, categories=DAY_ORDER, ordered=True)
             recent_df['minutes_played'] = recent_df['ms_played'] / 60000
             recent_df['hours_played'] = recent_df['minutes_played'] / 60
 
@@ -212,11 +218,18 @@ def create_recent_dashboard(df, time_period, spotify_api=None):
             'unique_songs': []
         }
 
+        # Timestamps sorted once, so each sample window is two binary searches instead of a full-column mask
+        order = np.argsort(df['ts'].values, kind='stable')
+        sorted_ts = df['ts'].values[order]
+        latest = df['ts'].max()
+
         # Get last 30 periods of this duration for comparison
         for i in range(30):
-            sample_end = df['ts'].max() - timedelta(days=i)
+            sample_end = latest - timedelta(days=i)
             sample_start = sample_end - timedelta(hours=hours)
-            sample_data = df[(df['ts'] >= sample_start) & (df['ts'] <= sample_end)]
+            lo = np.searchsorted(sorted_ts, sample_start.to_datetime64(), side='left')
+            hi = np.searchsorted(sorted_ts, sample_end.to_datetime64(), side='right')
+            sample_data = df.iloc[order[lo:hi]]
 
             if len(sample_data) > 0:
                 historical_data['tracks'].append(len(sample_data))
@@ -225,11 +238,7 @@ def create_recent_dashboard(df, time_period, spotify_api=None):
 
                 # Count unique genres if available
                 if 'genres' in sample_data.columns:
-                    sample_genres = []
-                    for genres_str in sample_data['genres']:
-                        if genres_str and genres_str != 'Unknown':
-                            sample_genres.extend([g.strip() for g in genres_str.split(',')])
-                    historical_data['unique_genres'].append(len(set(sample_genres)) if sample_genres else 0)
+                    historical_data['unique_genres'].append(split_genres(sample_data['genres']).nunique())
                 else:
                     historical_data['unique_genres'].append(0)
 
@@ -284,12 +293,9 @@ def create_recent_dashboard(df, time_period, spotify_api=None):
     # Top genre (if available)
     top_genre = "Unknown"
     if 'genres' in recent_data.columns:
-        all_genres = []
-        for genres_str in recent_data['genres']:
-            if genres_str and genres_str != 'Unknown':
-                all_genres.extend([g.strip() for g in genres_str.split(',')])
-        if all_genres:
-            top_genre = pd.Series(all_genres).value_counts().index[0]
+        all_genres = split_genres(recent_data['genres'])
+        if not all_genres.empty:
+            top_genre = all_genres.value_counts().index[0]
 
     # Top items summary - Show first!
     st.subheader("🏆 Your Top Picks")
@@ -518,13 +524,13 @@ def streaming_history_app():
                 recent_df['year'] = recent_df['ts'].dt.year
                 recent_df['month'] = recent_df['ts'].dt.month
                 recent_df['hour'] = recent_df['ts'].dt.hour
-                recent_df['day_of_week'] = recent_df['ts'].dt.day_name()
+                recent_df['day_of_week'] = pd.Categorical.from_codes(recent_df['ts'].dt.dayofweek, categories=DAY_ORDER, ordered=True)
                 recent_df['minutes_played'] = recent_df['ms_played'] / 60000
                 recent_df['hours_played'] = recent_df['minutes_played'] / 60
 
                 # Add genres for new tracks (fast since cached)
                 if spotify_api:
-                    recent_df = spotify_api.enrich_dataframe_with_genres(recent_df, show_progress=False)
+                    recent_df = spotify_api.enrich_dataframe_with_genres(recent_df, show_progress=False, inplace=True)
 
                 # Combine with enriched data
                 combined_df = pd.concat([df, recent_df], ignore_index=True)
@@ -602,7 +608,7 @@ def streaming_history_app():
 
         with col2:
             # Listening by hour
-            hourly_data = df_display.groupby('hour').size().reset_index()
+            hourly_data = df_display['hour'].value_counts().sort_index().reset_index()
             hourly_data.columns = ['hour', 'streams']
 
             fig = px.bar(hourly_data, x='hour', y='streams',
@@ -620,9 +626,8 @@ def streaming_history_app():
             st.plotly_chart(fig, use_container_width=True)
 
             # Day of week
-            day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-            dow_data = df_display.groupby('day_of_week')['hours_played'].sum().reindex(day_order)
-            fig = px.bar(x=day_order, y=dow_data.values, title='Listening Hours by Day of Week')
+            dow_data = df_display.groupby('day_of_week', observed=True)['hours_played'].sum().reindex(DAY_ORDER)
+            fig = px.bar(x=DAY_ORDER, y=dow_data.values, title='Listening Hours by Day of Week')
             fig.update_xaxes(title="day")
             st.plotly_chart(fig, use_container_width=True)
 
@@ -770,13 +775,10 @@ def streaming_history_app():
             with topcol3:
                 # Top genre
                 if 'genres' in range_data.columns:
-                    all_genres = []
-                    for genres_str in range_data['genres']:
-                        if genres_str and genres_str != 'Unknown':
-                            all_genres.extend([g.strip() for g in genres_str.split(',')])
+                    all_genres = split_genres(range_data['genres'])
 
-                    if all_genres:
-                        top_genre_counts = pd.Series(all_genres).value_counts()
+                    if not all_genres.empty:
+                        top_genre_counts = all_genres.value_counts()
                         top_genre = top_genre_counts.index[0]
                         top_genre_count = top_genre_counts.iloc[0]
                         st.write(f"**🎭 Top Genre:**")
@@ -1075,27 +1077,24 @@ def streaming_history_app():
             # Full historical analysis (no button needed!)
             st.subheader("📈 Complete Genre Evolution Over Time")
 
+            # Split the genres once, with each genre's year alongside; every chart below reads from these
+            all_historical_genres = split_genres(enriched_display['genres'].reset_index(drop=True))
+            genre_years = enriched_display['year'].to_numpy()[all_historical_genres.index.to_numpy()]
+            all_historical_genres = all_historical_genres.reset_index(drop=True)
+            historical_genre_counts = all_historical_genres.value_counts()
+
             # Group by year and analyze genres
             yearly_data = []
             for year in sorted(enriched_display['year'].unique()):
-                year_tracks = enriched_display[enriched_display['year'] == year]
-                year_genres = []
-                for genres_str in year_tracks['genres']:
-                    if genres_str and genres_str != 'Unknown':
-                        year_genres.extend([g.strip() for g in genres_str.split(',')])
+                year_genres = all_historical_genres[genre_years == year]
 
                 # Get top genres for this year
-                if year_genres:
-                    year_genre_counts = pd.Series(year_genres).value_counts()
+                if not year_genres.empty:
+                    year_genre_counts = year_genres.value_counts()
                     total_year_genres = len(year_genres)
 
                     # Get overall top genres to maintain consistency
-                    all_historical_genres = []
-                    for genres_str in enriched_display['genres']:
-                        if genres_str and genres_str != 'Unknown':
-                            all_historical_genres.extend([g.strip() for g in genres_str.split(',')])
-
-                    top_genres = pd.Series(all_historical_genres).value_counts().head(8).index
+                    top_genres = historical_genre_counts.head(8).index
 
                     for genre in top_genres:
                         percentage = (year_genre_counts.get(genre, 0) / total_year_genres * 100) if total_year_genres > 0 else 0
@@ -1121,12 +1120,7 @@ def streaming_history_app():
 
                 with col1:
                     # Overall genre distribution
-                    all_historical_genres = []
-                    for genres_str in enriched_display['genres']:
-                        if genres_str and genres_str != 'Unknown':
-                            all_historical_genres.extend([g.strip() for g in genres_str.split(',')])
-
-                    genre_counts = pd.Series(all_historical_genres).value_counts().head(10)
+                    genre_counts = historical_genre_counts.head(10)
                     fig2 = px.pie(values=genre_counts.values, names=genre_counts.index,
                                 title='Overall Genre Distribution')
                     st.plotly_chart(fig2, use_container_width=True)
@@ -1135,13 +1129,7 @@ def streaming_history_app():
                     # Genre diversity by year
                     diversity_data = []
                     for year in sorted(enriched_display['year'].unique()):
-                        year_tracks = enriched_display[enriched_display['year'] == year]
-                        year_genres = []
-                        for genres_str in year_tracks['genres']:
-                            if genres_str and genres_str != 'Unknown':
-                                year_genres.extend([g.strip() for g in genres_str.split(',')])
-
-                        unique_genres = len(set(year_genres))
+                        unique_genres = all_historical_genres[genre_years == year].nunique()
                         diversity_data.append({'year': year, 'unique_genres': unique_genres})
 
                     diversity_df = pd.DataFrame(diversity_data)
@@ -1,28 +1,215 @@
+import atexit
 import json
 import os
+import sqlite3
+import threading
+import time
+from collections import deque
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Set
+
+# orjson encodes/decodes the stored JSON columns several times faster than stdlib json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def dumps_json(obj) -> str:
+    """Serialize a value for a JSON text column"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def loads_json(data):
+    """Parse a JSON text column or file contents"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# How each kind of feedback is phrased in the prompt context
+FEEDBACK_PREFIXES = {
+    "positive": "Sara liked:",
+    "correction": "Sara corrected:",
+    "suggestion": "Sara wants:",
+    "negative": "Sara doesn't want:"
+}
 
 class SpotiBotiMemory:
+    # Retention limits: the in-memory deques evict automatically, the db is pruned lazily
+    MAX_INSIGHTS = 100
+    MAX_FEEDBACK = 50
+    PRUNE_EVERY = 20
+    RECENT_INSIGHTS = 20
+    RECENT_FEEDBACK = 5
+    # Minimum seconds between db flushes; pending writes are also flushed at exit
+    SAVE_INTERVAL = 2.0
+
     def __init__(self):
         self.memory_file = 'spotiboti_memory.json'
+        self.db_file = 'spotiboti_memory.db'
+        self.conn = self.connect_db()
+        self._inserts_since_prune = 0
+        self._pending_writes = []
+        self._dirty = False
+        self._last_save = 0.0
+        self._lock = threading.Lock()
+        atexit.register(self.save_memory)
         self.memory = self.load_memory()
+        self.build_token_index()
+        self.build_feedback_context()
+
+    def connect_db(self) -> sqlite3.Connection:
+        """Open the memory database and make sure the schema exists"""
+        conn = sqlite3.connect(self.db_file, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA mmap_size=67108864")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS insights (
+                id INTEGER PRIMARY KEY, ts TEXT, query TEXT, response_type TEXT, insights TEXT
+            );
+            CREATE TABLE IF NOT EXISTS feedback (
+                id INTEGER PRIMARY KEY, ts TEXT, query TEXT, response TEXT, type TEXT, text TEXT
+            );
+            CREATE TABLE IF NOT EXISTS music_prefs (
+                id INTEGER PRIMARY KEY, ts TEXT, type TEXT, data_json TEXT
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY, value TEXT
+            );
+        """)
+        return conn
 
     def load_memory(self) -> Dict:
         """Load SpotiBoti's persistent memory"""
-        if os.path.exists(self.memory_file):
-            try:
-                with open(self.memory_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception:
-                return self.create_empty_memory()
-        return self.create_empty_memory()
+        try:
+            self.migrate_json_memory()
+            memory = self.create_empty_memory()
+
+            for ts, query, response_type, insights in self.conn.execute(
+                "SELECT ts, query, response_type, insights FROM insights ORDER BY id DESC LIMIT ?",
+                (self.MAX_INSIGHTS,)
+            ).fetchall()[::-1]:
+                memory["conversation_insights"].append({
+                    "timestamp": ts,
+                    "query": query,
+                    "response_type": response_type,
+                    "insights": loads_json(insights)
+                })
+
+            for ts, query, response, feedback_type, text in self.conn.execute(
+                "SELECT ts, query, response, type, text FROM feedback ORDER BY id DESC LIMIT ?",
+                (self.MAX_FEEDBACK,)
+            ).fetchall()[::-1]:
+                memory["user_feedback"].append({
+                    "timestamp": ts,
+                    "query": query,
+                    "response": response,
+                    "feedback_type": feedback_type,
+                    "feedback_text": text
+                })
+
+            for preference_type, data_json in self.conn.execute(
+                "SELECT type, data_json FROM music_prefs ORDER BY id"
+            ):
+                memory["music_preferences"].setdefault(preference_type, []).append(loads_json(data_json))
+
+            meta = dict(self.conn.execute("SELECT key, value FROM meta"))
+            memory["session_count"] = int(meta.get("session_count", 0))
+            memory["last_updated"] = meta.get("last_updated")
+            return memory
+        except Exception:
+            return self.create_empty_memory()
+
+    def migrate_json_memory(self):
+        """One-off import of a legacy spotiboti_memory.json into the database"""
+        if not os.path.exists(self.memory_file):
+            return
+        if self.conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_json'").fetchone():
+            return
+
+        with open(self.memory_file, 'rb') as f:
+            legacy = loads_json(f.read())
+
+        self.conn.execute("BEGIN")
+        self.conn.executemany(
+            "INSERT INTO insights (ts, query, response_type, insights) VALUES (?, ?, ?, ?)",
+            [(i["timestamp"], i["query"], i["response_type"], dumps_json(i["insights"]))
+             for i in legacy.get("conversation_insights", [])]
+        )
+        self.conn.executemany(
+            "INSERT INTO feedback (ts, query, response, type, text) VALUES (?, ?, ?, ?, ?)",
+            [(f["timestamp"], f["query"], f["response"], f["feedback_type"], f["feedback_text"])
+             for f in legacy.get("user_feedback", [])]
+        )
+        self.conn.executemany(
+            "INSERT INTO music_prefs (ts, type, data_json) VALUES (?, ?, ?)",
+            [(p.get("learned_at"), pref_type, dumps_json(p))
+             for pref_type, prefs in legacy.get("music_preferences", {}).items() for p in prefs]
+        )
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [("session_count", str(legacy.get("session_count", 0))),
+             ("last_updated", legacy.get("last_updated")),
+             ("migrated_json", "1")]
+        )
+        self.conn.execute("COMMIT")
+
+    @staticmethod
+    def query_tokens(text: str) -> Set[str]:
+        """Lowercased words long enough to be meaningful for matching"""
+        return {word for word in text.lower().split() if len(word) > 3}
+
+    def build_token_index(self):
+        """Build the token -> insight id index over the loaded insights"""
+        self._token_index: Dict[str, Set[int]] = {}
+        self._insight_tokens: Dict[int, Set[str]] = {}
+        self._insights_by_id: Dict[int, Dict] = {}
+        self._next_insight_id = 0
+        for insight in self.memory["conversation_insights"]:
+            self.index_insight(insight)
+
+    def index_insight(self, insight: Dict):
+        """Add an insight to the token index and drop the one that fell out of retention"""
+        insight_id = self._next_insight_id
+        self._next_insight_id += 1
+
+        tokens = self.query_tokens(insight["query"])
+        self._insights_by_id[insight_id] = insight
+        self._insight_tokens[insight_id] = tokens
+        for token in tokens:
+            self._token_index.setdefault(token, set()).add(insight_id)
+
+        expired_id = insight_id - self.MAX_INSIGHTS
+        if expired_id in self._insights_by_id:
+            del self._insights_by_id[expired_id]
+            for token in self._insight_tokens.pop(expired_id):
+                ids = self._token_index[token]
+                ids.discard(expired_id)
+                if not ids:
+                    del self._token_index[token]
+
+    def build_feedback_context(self):
+        """Pre-format the most recent feedback lines used in the prompt context"""
+        self._feedback_lines = deque(maxlen=self.RECENT_FEEDBACK)
+        for feedback in self.memory["user_feedback"]:
+            self.add_feedback_line(feedback)
+
+    def add_feedback_line(self, feedback: Dict):
+        """Format a feedback item once, at insert time"""
+        prefix = FEEDBACK_PREFIXES.get(feedback["feedback_type"])
+        if prefix:
+            self._feedback_lines.append(f"{prefix} {feedback['feedback_text']}")
 
     def create_empty_memory(self) -> Dict:
         """Create empty memory structure"""
         return {
-            "conversation_insights": [],
-            "user_feedback": [],
+            "conversation_insights": deque(maxlen=self.MAX_INSIGHTS),
+            "user_feedback": deque(maxlen=self.MAX_FEEDBACK),
             "music_preferences": {},
             "learned_patterns": {},
             "favorite_responses": [],
@@ -32,13 +219,51 @@ class SpotiBotiMemory:
         }
 
     def save_memory(self):
-        """Save memory to file"""
-        self.memory["last_updated"] = datetime.now().isoformat()
-        try:
-            with open(self.memory_file, 'w', encoding='utf-8') as f:
-                json.dump(self.memory, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"Could not save memory: {e}")
+        """Write all pending changes to the database in a single transaction"""
+        with self._lock:
+            if not self._dirty:
+                return
+            self.memory["last_updated"] = datetime.now().isoformat()
+            self._pending_writes.append((
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_updated', ?)",
+                (self.memory["last_updated"],)
+            ))
+            try:
+                self.conn.execute("BEGIN")
+                for sql, params in self._pending_writes:
+                    self.conn.execute(sql, params)
+                self.conn.execute("COMMIT")
+            except Exception as e:
+                if self.conn.in_transaction:
+                    self.conn.execute("ROLLBACK")
+                print(f"Could not save memory: {e}")
+            # Failed writes are dropped rather than retried forever
+            self._pending_writes = []
+            self._dirty = False
+            self._last_save = time.monotonic()
+
+    def queue_write(self, sql: str, params: tuple):
+        """Record a change and flush if the last save was long enough ago"""
+        with self._lock:
+            self._pending_writes.append((sql, params))
+            self._dirty = True
+        if time.monotonic() - self._last_save > self.SAVE_INTERVAL:
+            self.save_memory()
+
+    def prune_memory(self):
+        """Trim the insight and feedback tables down to their retention limits"""
+        self._inserts_since_prune += 1
+        if self._inserts_since_prune < self.PRUNE_EVERY:
+            return
+        self._inserts_since_prune = 0
+        self.queue_write(
+            "DELETE FROM insights WHERE id NOT IN (SELECT id FROM insights ORDER BY id DESC LIMIT ?)",
+            (self.MAX_INSIGHTS,)
+        )
+        self.queue_write(
+            "DELETE FROM feedback WHERE id NOT IN (SELECT id FROM feedback ORDER BY id DESC LIMIT ?)",
+            (self.MAX_FEEDBACK,)
+        )
 
     def add_conversation_insight(self, query: str, response_type: str, key_insights: List[str]):
         """Store insights from conversations"""
@@ -48,13 +273,14 @@ class SpotiBotiMemory:
             "response_type": response_type,
             "insights": key_insights
         }
-        self.memory["conversation_insights"].append(insight)
-
-        # Keep only last 100 insights to prevent file bloat
-        if len(self.memory["conversation_insights"]) > 100:
-            self.memory["conversation_insights"] = self.memory["conversation_insights"][-100:]
+        self.memory["conversation_insights"].append(insight)  # Bounded to the last 100
+        self.index_insight(insight)
 
-        self.save_memory()
+        self.queue_write(
+            "INSERT INTO insights (ts, query, response_type, insights) VALUES (?, ?, ?, ?)",
+            (insight["timestamp"], query, response_type, dumps_json(key_insights))
+        )
+        self.prune_memory()
 
     def add_user_feedback(self, query: str, response: str, feedback_type: str, feedback_text: str):
         """Store user feedback on responses"""
@@ -65,13 +291,14 @@ class SpotiBotiMemory:
             "feedback_type": feedback_type,  # "positive", "negative", "correction", "suggestion"
             "feedback_text": feedback_text
         }
-        self.memory["user_feedback"].append(feedback)
+        self.memory["user_feedback"].append(feedback)  # Bounded to the last 50
+        self.add_feedback_line(feedback)
 
-        # Keep only last 50 feedback items
-        if len(self.memory["user_feedback"]) > 50:
-            self.memory["user_feedback"] = self.memory["user_feedback"][-50:]
-
-        self.save_memory()
+        self.queue_write(
+            "INSERT INTO feedback (ts, query, response, type, text) VALUES (?, ?, ?, ?, ?)",
+            (feedback["timestamp"], query, feedback["response"], feedback_type, feedback_text)
+        )
+        self.prune_memory()
 
     def update_music_preference(self, preference_type: str, preference_data: Dict):
         """Update learned music preferences"""
@@ -82,19 +309,32 @@ class SpotiBotiMemory:
         preference_data["learned_at"] = datetime.now().isoformat()
         self.memory["music_preferences"][preference_type].append(preference_data)
 
-        self.save_memory()
+        self.queue_write(
+            "INSERT INTO music_prefs (ts, type, data_json) VALUES (?, ?, ?)",
+            (preference_data["learned_at"], preference_type, dumps_json(preference_data))
+        )
 
     def get_relevant_context(self, query: str) -> str:
         """Get relevant context from memory for current query"""
         context_parts = []
 
         # Add relevant insights from past conversations
-        query_lower = query.lower()
         relevant_insights = []
 
-        for insight in self.memory["conversation_insights"][-20:]:  # Last 20 insights
-            if any(word in insight["query"].lower() for word in query_lower.split() if len(word) > 3):
-                relevant_insights.extend(insight["insights"])
+        query_tokens = self.query_tokens(query)
+        if query_tokens and self._token_index:
+            recent_start = self._next_insight_id - self.RECENT_INSIGHTS  # Last 20 insights
+            candidate_ids = [
+                insight_id
+                for token in query_tokens
+                for insight_id in self._token_index.get(token, ())
+                if insight_id >= recent_start
+            ]
+            # Walk newest first and stop once the last 5 relevant insights are known
+            for insight_id in sorted(set(candidate_ids), reverse=True):
+                relevant_insights[:0] = self._insights_by_id[insight_id]["insights"]
+                if len(relevant_insights) >= 5:
+                    break
 
         if relevant_insights:
             context_parts.append("Past conversation insights:")
@@ -102,20 +342,9 @@ class SpotiBotiMemory:
                 context_parts.append(f"- {insight}")
 
         # Add relevant feedback patterns
-        relevant_feedback = []
-        for feedback in self.memory["user_feedback"][-10:]:  # Last 10 feedback items
-            if feedback["feedback_type"] == "positive":
-                relevant_feedback.append(f"Sara liked: {feedback['feedback_text']}")
-            elif feedback["feedback_type"] == "correction":
-                relevant_feedback.append(f"Sara corrected: {feedback['feedback_text']}")
-            elif feedback["feedback_type"] == "suggestion":
-                relevant_feedback.append(f"Sara wants: {feedback['feedback_text']}")
-            elif feedback["feedback_type"] == "negative":
-                relevant_feedback.append(f"Sara doesn't want: {feedback['feedback_text']}")
-
-        if relevant_feedback:
+        if self._feedback_lines:
             context_parts.append("\nUser preferences learned:")
-            context_parts.extend(relevant_feedback[-5:])  # Last 5 relevant feedback items
+            context_parts.extend(self._feedback_lines)  # Last 5 relevant feedback items
 
         # Add music preferences
         if self.memory["music_preferences"]:
@@ -130,7 +359,10 @@ class SpotiBotiMemory:
     def increment_session(self):
         """Track new session"""
         self.memory["session_count"] += 1
-        self.save_memory()
+        self.queue_write(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('session_count', ?)",
+            (str(self.memory["session_count"]),)
+        )
 
     def get_memory_stats(self) -> Dict:
         """Get memory statistics"""
@@ -140,4 +372,4 @@ class SpotiBotiMemory:
             "music_preferences": len(self.memory.get("music_preferences", [])),
             "sessions": self.memory.get("session_count", 0),
             "last_updated": self.memory.get("last_updated")
-        }
\ No newline at end of file
+        }
@@ -4,6 +4,7 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import json
 import glob
+import hashlib
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -18,39 +19,58 @@ os.chdir('/Users/sarakaczmarek/Desktop/Spotify/streaming_data')
 audio_files = glob.glob('Streaming_History_Audio_*.json')
 print(f"Found {len(audio_files)} audio history files")
 
-all_streams = []
-for file in sorted(audio_files):
-    print(f"Loading {file}...")
-    with open(file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-        all_streams.extend(data)
-
-print(f"Total streams loaded: {len(all_streams):,}")
-
-df = pd.DataFrame(all_streams)
+# Columns not used in the analysis; dropped per file so they never reach the combined frame
+unused_columns = ['platform','ip_addr','spotify_track_uri','episode_name','episode_show_name',
+                  'spotify_episode_uri','audiobook_title','audiobook_uri','audiobook_chapter_uri',
+                  'audiobook_chapter_title','offline_timestamp','incognito_mode']
+
+# Cleaned frames are cached as Parquet, keyed by the source files and their mtimes
+cache_key = hashlib.md5(''.join(f"{f}{os.path.getmtime(f)}" for f in sorted(audio_files)).encode()).hexdigest()
+cache_file = f'streaming_cache_{cache_key}.parquet'
+from_cache = os.path.exists(cache_file)
+
+if from_cache:
+    print(f"Loading cached streams from {cache_file}...")
+    df = pd.read_parquet(cache_file)
+else:
+    dfs = []
+    for file in sorted(audio_files):
+        print(f"Loading {file}...")
+        file_df = pd.read_json(file, convert_dates=False)
+        file_df.drop(columns=unused_columns, errors='ignore', inplace=True)
+        dfs.append(file_df)
+        del file_df
+
+    df = pd.concat(dfs, ignore_index=True)
+    del dfs
+
+print(f"Total streams loaded: {len(df):,}")
 print(f"DataFrame shape: {df.shape}")
 
 display(df)
 
 #%%
 # Clean and prepare data
-df['ts'] = pd.to_datetime(df['ts'])
-df['date'] = df['ts'].dt.date
-df['year'] = df['ts'].dt.year
-df['month'] = df['ts'].dt.month
-df['hour'] = df['ts'].dt.hour
-df['day_of_week'] = df['ts'].dt.day_name()
+day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+if not from_cache:
+    df['ts'] = pd.to_datetime(df['ts'], format='ISO8601', utc=True, cache=True)
+    df['date'] = df['ts'].dt.date
+    df['year'] = df['ts'].dt.year
+    df['month'] = df['ts'].dt.month
+    df['hour'] = df['ts'].dt.hour
+    df['day_of_week'] = pd.Categorical.from_codes(df['ts'].dt.dayofweek, categories=day_order, ordered=True)
 
-df['minutes_played'] = df['ms_played'] / 60000
-df['hours_played'] = df['minutes_played'] / 60
+    df['minutes_played'] = df['ms_played'] / 60000
+    df['hours_played'] = df['minutes_played'] / 60
 
-df = df.drop(columns=['platform','ip_addr','spotify_track_uri','episode_name','episode_show_name',
-                      'spotify_episode_uri','audiobook_title','audiobook_uri','audiobook_chapter_uri',
-                      'audiobook_chapter_title','offline_timestamp','incognito_mode'])
+    df = df.rename(columns ={'conn_country':'country','master_metadata_track_name':'song',
+                             'master_metadata_album_artist_name':'artist','master_metadata_album_album_name':'album'})
 
+    # Repeated strings as categoricals: less memory and hash-based groupby
+    for col in ('country', 'song', 'artist', 'album'):
+        df[col] = df[col].astype('category')
 
-df = df.rename(columns ={'conn_country':'country','master_metadata_track_name':'song',
-                         'master_metadata_album_artist_name':'artist','master_metadata_album_album_name':'album'})
+    df.to_parquet(cache_file, compression='zstd')
 
 display(df)
 #%%
@@ -58,7 +78,10 @@ display(df)
 #%%
 
 # Filter out very short plays (less than 30 seconds)
-df_filtered = df[df['ms_played'] >= 30000].copy()
+# Only the columns used below are materialized in the copy
+keep_cols = ['ts','date','year','month','hour','day_of_week','ms_played','hours_played','artist','song','country']
+mask = df['ms_played'].values >= 30000
+df_filtered = df.loc[mask, keep_cols].copy()
 
 print(f"\\nAfter filtering short plays: {len(df_filtered):,} streams")
 print(f"Total hours listened: {df_filtered['hours_played'].sum():,.1f}")
@@ -73,12 +96,19 @@ print(f"Average hours per day: {df_filtered['hours_played'].sum() / (df_filtered
 print(f"Unique artists: {df_filtered['artist'].nunique():,}")
 print(f"Unique tracks: {df_filtered['song'].nunique():,}")
 
+# Aggregate once; the plots and the summaries below reuse these
+daily_hours = df_filtered.groupby('date')['hours_played'].sum().reset_index()
+artist_hours = df_filtered.groupby('artist', observed=True)['hours_played'].sum().sort_values(ascending=False)
+dow_hours = df_filtered.groupby('day_of_week')['hours_played'].sum().reindex(day_order)
+hourly_streams = df_filtered.groupby('hour').size()
+yearly_hours = df_filtered.groupby('year')['hours_played'].sum()
+song_counts = df_filtered['song'].value_counts()
+
 # Create visualizations
 fig = plt.figure(figsize=(20, 15))
 
 # 1. Daily listening hours over time
 plt.subplot(3, 2, 1)
-daily_hours = df_filtered.groupby('date')['hours_played'].sum().reset_index()
 daily_hours['date'] = pd.to_datetime(daily_hours['date'])
 plt.plot(daily_hours['date'], daily_hours['hours_played'], alpha=0.7, linewidth=0.8)
 plt.title('Daily Listening Hours Over Time', fontsize=14)
@@ -87,7 +117,7 @@ plt.xticks(rotation=45)
 
 # 2. Top 15 artists by hours
 plt.subplot(3, 2, 2)
-top_artists_hours = df_filtered.groupby('artist')['hours_played'].sum().sort_values(ascending=False).head(15)
+top_artists_hours = artist_hours.head(15)
 plt.barh(range(len(top_artists_hours)), top_artists_hours.values)
 plt.yticks(range(len(top_artists_hours)), top_artists_hours.index, fontsize=9)
 plt.title('Top 15 Artists by Hours Played', fontsize=14)
@@ -96,8 +126,6 @@ plt.gca().invert_yaxis()
 
 # 3. Listening by day of week
 plt.subplot(3, 2, 3)
-day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-dow_hours = df_filtered.groupby('day_of_week')['hours_played'].sum().reindex(day_order)
 plt.bar(dow_hours.index, dow_hours.values)
 plt.title('Listening Hours by Day of Week', fontsize=14)
 plt.ylabel('Hours')
@@ -105,7 +133,6 @@ plt.xticks(rotation=45)
 
 # 4. Listening by hour of day
 plt.subplot(3, 2, 4)
-hourly_streams = df_filtered.groupby('hour').size()
 plt.bar(hourly_streams.index, hourly_streams.values)
 plt.title('Streams by Hour of Day', fontsize=14)
 plt.xlabel('Hour')
@@ -113,7 +140,6 @@ plt.ylabel('Number of Streams')
 
 # 5. Yearly listening trends
 plt.subplot(3, 2, 5)
-yearly_hours = df_filtered.groupby('year')['hours_played'].sum()
 plt.bar(yearly_hours.index, yearly_hours.values)
 plt.title('Yearly Listening Hours', fontsize=14)
 plt.xlabel('Year')
@@ -121,7 +147,7 @@ plt.ylabel('Hours')
 
 # 6. Top 15 tracks
 plt.subplot(3, 2, 6)
-top_tracks = df_filtered['song'].value_counts().head(15)
+top_tracks = song_counts.head(15)
 plt.barh(range(len(top_tracks)), top_tracks.values)
 plt.yticks(range(len(top_tracks)), [t[:30] + '...' if len(t) > 30 else t for t in top_tracks.index], fontsize=8)
 plt.title('Top 15 Most Played Tracks', fontsize=14)
@@ -133,21 +159,24 @@ plt.show()
 
 # Top artists and tracks summary
 print("\\n=== TOP 10 ARTISTS BY HOURS ===")
-top_10_artists = df_filtered.groupby('artist')['hours_played'].sum().sort_values(ascending=False).head(10)
+top_10_artists = artist_hours.head(10)
 for i, (artist, hours) in enumerate(top_10_artists.items(), 1):
     print(f"{i:2d}. {artist}: {hours:.1f} hours")
 
 print("\\n=== TOP 10 MOST PLAYED TRACKS ===")
-top_10_tracks = df_filtered['song'].value_counts().head(10)
+top_10_tracks = song_counts.head(10)
+song_artist = df_filtered.groupby('song', observed=True)['artist'].first()
 for i, (track, count) in enumerate(top_10_tracks.items(), 1):
-    artist = df_filtered[df_filtered['song'] == track]['artist'].iloc[0]
+    artist = song_artist[track]
     print(f"{i:2d}. {track} by {artist}: {count} plays")
 
 # Countries analysis
 print(f"\\n=== COUNTRIES LISTENED FROM ===")
 country_stats = df_filtered['country'].value_counts()
+country_stats = country_stats[country_stats > 0]  # Categorical counts include unused countries
 print(f"Total countries: {len(country_stats)}")
-for country, count in country_stats.items():
-    percentage = (count / len(df_filtered)) * 100
-    print(f"{country}: {count:,} streams ({percentage:.1f}%)")
+country_pct = country_stats / len(df_filtered) * 100
+country_lines = (country_stats.index.astype(str).to_series(index=country_stats.index) + ': '
+                 + country_stats.map('{:,} streams'.format) + ' ' + country_pct.map('({:.1f}%)'.format))
+print('\n'.join(country_lines))
 # %%
@@ -1,10 +1,55 @@
 import spotipy
 from spotipy.oauth2 import SpotifyOAuth, SpotifyClientCredentials
 import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import streamlit as st
 from genre_cache import GenreCache
+from artwork_cache import ArtworkCache
+
+# Maximum number of artists kept in the in-process genre memo
+GENRE_MEMO_SIZE = 4096
+
+# Spotify's Web API tolerates roughly 10 requests per second per app
+SPOTIFY_REQUESTS_PER_SECOND = 10
+GENRE_FETCH_WORKERS = 8
+
+# Maximum number of artist ids Spotify accepts in one /v1/artists request
+ARTISTS_BATCH_SIZE = 50
+
+# Keep-alive pool sized for the genre fetch workers
+HTTP_POOL_SIZE = 16
+
+# Projection for playlist item pages: only the track fields get_playlist_tracks reads
+PLAYLIST_TRACK_FIELDS = (
+    'items(added_at,track(type,id,name,duration_ms,popularity,preview_url,'
+    'external_urls(spotify),artists(name),album(name,images)))'
+)
+
+
+class RateLimiter:
+    """Spaces out calls so at most `rate` start per second, shared across threads"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+
+    def wait(self):
+        """Block until the caller's turn to send a request"""
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
 
 class SpotifyAPI:
     def __init__(self, client_id=None, client_secret=None, redirect_uri="http://127.0.0.1:8080/callback"):
@@ -36,8 +81,34 @@ class SpotifyAPI:
         )
 
         self.sp = None
+        self.session = self.create_session()
         self.genre_cache = GenreCache()
 
+        # In-process memo in front of the genre cache, keyed by normalized artist name
+        self._genre_memo = {}
+        self.rate_limiter = RateLimiter(SPOTIFY_REQUESTS_PER_SECOND)
+
+        # (track, artist) -> artwork URL from the user's playlists, built on first lookup
+        self.artwork_cache = ArtworkCache()
+        self._artwork_index = None
+
+    def create_session(self):
+        """HTTP session with pooled keep-alive connections and retries on transient errors"""
+        retry = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=frozenset(['GET', 'POST', 'PUT', 'DELETE'])
+        )
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        return session
+
+    def create_client(self, access_token):
+        """Spotipy client that reuses the pooled session"""
+        return spotipy.Spotify(auth=access_token, requests_session=self.session)
+
     def authenticate(self):
         """Authenticate with Spotify using cached token or automatic flow"""
         try:
@@ -45,7 +116,7 @@ class SpotifyAPI:
             token_info = self.sp_oauth.get_cached_token()
 
             if token_info:
-                self.sp = spotipy.Spotify(auth=token_info['access_token'])
+                self.sp = self.create_client(token_info['access_token'])
                 return True
             else:
                 # If no cached token, we need manual auth
@@ -65,7 +136,7 @@ class SpotifyAPI:
                         if code:
                             token_info = self.sp_oauth.get_access_token(code)
                             if token_info:
-                                self.sp = spotipy.Spotify(auth=token_info['access_token'])
+                                self.sp = self.create_client(token_info['access_token'])
                                 st.success("✅ Authentication successful!")
                                 st.rerun()
                                 return True
@@ -90,39 +161,47 @@ class SpotifyAPI:
 
         try:
             results = self.sp.current_user_recently_played(limit=limit)
-            tracks = []
+
+            # Collect columns directly; a dict of lists is the fast DataFrame constructor path
+            played_at, names, artists, artist_ids, albums, uris, images, durations = [], [], [], [], [], [], [], []
 
             for item in results['items']:
                 track = item['track']
-                played_at = item['played_at']
 
                 # Get album artwork (use medium size if available)
                 album_image_url = None
                 if track['album']['images']:
                     # Spotify provides images in different sizes, pick medium size (typically 300x300)
-                    images = track['album']['images']
-                    if len(images) >= 2:
-                        album_image_url = images[1]['url']  # Medium size
+                    album_images = track['album']['images']
+                    if len(album_images) >= 2:
+                        album_image_url = album_images[1]['url']  # Medium size
                     else:
-                        album_image_url = images[0]['url']  # Use whatever is available
-
-                track_data = {
-                    'ts': played_at,
-                    'master_metadata_track_name': track['name'],
-                    'master_metadata_album_artist_name': track['artists'][0]['name'] if track['artists'] else 'Unknown',
-                    'master_metadata_album_album_name': track['album']['name'],
-                    'spotify_track_uri': track['uri'],
-                    'album_image_url': album_image_url,
-                    'ms_played': track['duration_ms'],  # Full duration since we don't have actual play time
-                    'conn_country': 'Unknown',  # Not available in recently played
-                    'ip_addr_decrypted': 'Unknown',  # Not available
-                    'user_agent_decrypted': 'API',
-                    'platform': 'API',
-                    'skipped': False  # Assume not skipped for recently played
-                }
-                tracks.append(track_data)
-
-            return pd.DataFrame(tracks)
+                        album_image_url = album_images[0]['url']  # Use whatever is available
+
+                played_at.append(item['played_at'])
+                names.append(track['name'])
+                artists.append(track['artists'][0]['name'] if track['artists'] else 'Unknown')
+                artist_ids.append(track['artists'][0].get('id') if track['artists'] else None)
+                albums.append(track['album']['name'])
+                uris.append(track['uri'])
+                images.append(album_image_url)
+                durations.append(track['duration_ms'])
+
+            return pd.DataFrame({
+                'ts': played_at,
+                'master_metadata_track_name': names,
+                'master_metadata_album_artist_name': artists,
+                'artist_id': artist_ids,
+                'master_metadata_album_album_name': albums,
+                'spotify_track_uri': uris,
+                'album_image_url': images,
+                'ms_played': durations,  # Full duration since we don't have actual play time
+                'conn_country': 'Unknown',  # Not available in recently played
+                'ip_addr_decrypted': 'Unknown',  # Not available
+                'user_agent_decrypted': 'API',
+                'platform': 'API',
+                'skipped': False  # Assume not skipped for recently played
+            })
 
         except Exception as e:
             st.error(f"Error fetching recently played tracks: {e}")
@@ -140,19 +219,15 @@ class SpotifyAPI:
                 limit=limit
             )
 
-            tracks = []
-            for track in results['items']:
-                track_data = {
-                    'master_metadata_track_name': track['name'],
-                    'master_metadata_album_artist_name': track['artists'][0]['name'] if track['artists'] else 'Unknown',
-                    'master_metadata_album_album_name': track['album']['name'],
-                    'spotify_track_uri': track['uri'],
-                    'popularity': track['popularity'],
-                    'duration_ms': track['duration_ms']
-                }
-                tracks.append(track_data)
-
-            return pd.DataFrame(tracks)
+            items = results['items']
+            return pd.DataFrame({
+                'master_metadata_track_name': [track['name'] for track in items],
+                'master_metadata_album_artist_name': [track['artists'][0]['name'] if track['artists'] else 'Unknown' for track in items],
+                'master_metadata_album_album_name': [track['album']['name'] for track in items],
+                'spotify_track_uri': [track['uri'] for track in items],
+                'popularity': [track['popularity'] for track in items],
+                'duration_ms': [track['duration_ms'] for track in items]
+            })
 
         except Exception as e:
             st.error(f"Error fetching top tracks: {e}")
@@ -170,18 +245,14 @@ class SpotifyAPI:
                 limit=limit
             )
 
-            artists = []
-            for artist in results['items']:
-                artist_data = {
-                    'name': artist['name'],
-                    'popularity': artist['popularity'],
-                    'genres': ', '.join(artist['genres']) if artist['genres'] else 'Unknown',
-                    'followers': artist['followers']['total'],
-                    'spotify_uri': artist['uri']
-                }
-                artists.append(artist_data)
-
-            return pd.DataFrame(artists)
+            items = results['items']
+            return pd.DataFrame({
+                'name': [artist['name'] for artist in items],
+                'popularity': [artist['popularity'] for artist in items],
+                'genres': [', '.join(artist['genres']) if artist['genres'] else 'Unknown' for artist in items],
+                'followers': [artist['followers']['total'] for artist in items],
+                'spotify_uri': [artist['uri'] for artist in items]
+            })
 
         except Exception as e:
             st.error(f"Error fetching top artists: {e}")
@@ -199,15 +270,94 @@ class SpotifyAPI:
             return None
 
     def get_artist_genres(self, artist_name):
-        """Get genres for an artist, using cache first"""
-        if not self.sp:
+        """Get genres for an artist, using cache first (cached genres are served even without a session)"""
+        genres = self._cached_artist_genres(artist_name)
+        if genres is None:
+            if not self.sp:
+                return []
+            genres = self._fetch_artist_genres(artist_name)
+            self._remember_artist_genres(artist_name, genres)
+        return genres
+
+    def get_artists_genres(self, artist_ids):
+        """Get genres for several artists at once, given {artist name: Spotify artist id or None/NaN}
+
+        Cached artists cost nothing, even without a session; the rest are fetched up to
+        50 ids per request, and artists without an id fall back to concurrent name searches.
+        """
+        artist_genres = {}
+        to_fetch = {}
+        to_search = []
+        for artist_name, artist_id in artist_ids.items():
+            genres = self._cached_artist_genres(artist_name)
+            if genres is not None:
+                artist_genres[artist_name] = genres
+            elif not self.sp:
+                artist_genres[artist_name] = []
+            elif pd.notna(artist_id) and artist_id:
+                to_fetch[artist_id] = artist_name
+            else:
+                to_search.append(artist_name)
+
+        ids = list(to_fetch)
+        for start in range(0, len(ids), ARTISTS_BATCH_SIZE):
+            batch = ids[start:start + ARTISTS_BATCH_SIZE]
+            self.rate_limiter.wait()
+            try:
+                found = self.sp.artists(batch)['artists']
+            except Exception:
+                found = [None] * len(batch)
+
+            for artist_id, artist in zip(batch, found):
+                artist_name = to_fetch[artist_id]
+                if artist is None:
+                    # Unknown id or failed request: try the name search instead
+                    to_search.append(artist_name)
+                    continue
+                genres = artist.get('genres', [])
+                self.genre_cache.set_artist_genres(artist_name, genres)
+                self._remember_artist_genres(artist_name, genres)
+                artist_genres[artist_name] = genres
+
+        # Name searches run concurrently; the rate limiter keeps us under Spotify's limit.
+        # The memo is only written here, after each search has returned.
+        if to_search:
+            with ThreadPoolExecutor(max_workers=GENRE_FETCH_WORKERS) as executor:
+                for artist_name, genres in zip(to_search, executor.map(self._fetch_artist_genres, to_search)):
+                    self._remember_artist_genres(artist_name, genres)
+                    artist_genres[artist_name] = genres
+
+        return artist_genres
+
+    def _cached_artist_genres(self, artist_name):
+        """Return cached genres for an artist, or None if the API has to be asked"""
+        # Plays without an artist (podcasts, episodes) carry NaN; there is nothing to look up
+        if not isinstance(artist_name, str):
             return []
 
-        # Check cache first
+        # Repeat lookups (including case variants) are served from memory
+        genres = self._genre_memo.get(artist_name.strip().casefold())
+        if genres is not None:
+            return genres
+
         cached_data = self.genre_cache.get_artist_genres(artist_name)
         if cached_data:
-            return cached_data.get('genres', [])
+            genres = cached_data.get('genres', [])
+            self._remember_artist_genres(artist_name, genres)
+            return genres
+        return None
+
+    def _remember_artist_genres(self, artist_name, genres):
+        """Store genres in the in-process memo, evicting the oldest entry when full"""
+        if not isinstance(artist_name, str):
+            return
+        if len(self._genre_memo) >= GENRE_MEMO_SIZE:
+            del self._genre_memo[next(iter(self._genre_memo))]
+        self._genre_memo[artist_name.strip().casefold()] = genres
 
+    def _fetch_artist_genres(self, artist_name):
+        """Search Spotify for an artist's genres and store them in the genre cache"""
+        self.rate_limiter.wait()
         try:
             # Search for the artist
             results = self.sp.search(q=f"artist:{artist_name}", type='artist', limit=1)
@@ -228,13 +378,16 @@ class SpotifyAPI:
         self.genre_cache.set_artist_genres(artist_name, [])
         return []
 
-    def enrich_dataframe_with_genres(self, df, max_tracks=None, show_progress=True):
-        """Add genre information to a dataframe of tracks using artist genres"""
+    def enrich_dataframe_with_genres(self, df, max_tracks=None, show_progress=True, inplace=False):
+        """Add genre information to a dataframe of tracks using artist genres
+
+        Pass inplace=True when the caller owns df and doesn't need the original kept intact.
+        """
         if not self.sp:
             return df
 
-        # Make a copy to avoid modifying the original
-        df_copy = df.copy()
+        # Make a copy to avoid modifying the original, unless the caller opted out
+        df_copy = df if inplace else df.copy()
         df_copy['genres'] = ''
 
         # Get unique artists to minimize API calls
@@ -249,23 +402,30 @@ class SpotifyAPI:
                 progress_bar = st.progress(0)
                 status_text = st.empty()
 
-        # Fetch genres for unique artists
+        # Resolve cached artists directly; only the rest need API calls
         artist_genres_map = {}
-        for i, artist in enumerate(unique_artists):
-            if show_progress:
-                status_text.text(f"Fetching genres for artist {i+1}/{len(unique_artists)}: {artist}")
-
-            genres = self.get_artist_genres(artist)
-            artist_genres_map[artist] = ', '.join(genres) if genres else 'Unknown'
-
-            if show_progress:
-                progress_bar.progress((i + 1) / len(unique_artists))
-
-            # Small delay to avoid rate limiting (only for new API calls)
-            cached_data = self.genre_cache.get_artist_genres(artist)
-            if not cached_data:
-                import time
-                time.sleep(0.1)
+        uncached_artists = []
+        for artist in unique_artists:
+            genres = self._cached_artist_genres(artist)
+            if genres is None:
+                uncached_artists.append(artist)
+            else:
+                artist_genres_map[artist] = ', '.join(genres) if genres else 'Unknown'
+
+        # Fetch the uncached artists concurrently; the rate limiter keeps us under Spotify's limit
+        if uncached_artists:
+            with ThreadPoolExecutor(max_workers=GENRE_FETCH_WORKERS) as executor:
+                futures = {executor.submit(self._fetch_artist_genres, artist): artist for artist in uncached_artists}
+                for future in as_completed(futures):
+                    artist = futures[future]
+                    genres = future.result()
+                    self._remember_artist_genres(artist, genres)
+                    artist_genres_map[artist] = ', '.join(genres) if genres else 'Unknown'
+
+                    if show_progress:
+                        done = len(artist_genres_map)
+                        status_text.text(f"Fetching genres for artist {done}/{len(unique_artists)}: {artist}")
+                        progress_bar.progress(done / len(unique_artists))
 
         # Apply genres to all tracks
         df_copy['genres'] = df_copy['master_metadata_album_artist_name'].map(artist_genres_map)
@@ -327,57 +487,77 @@ class SpotifyAPI:
             st.error(f"Error fetching playlists: {e}")
             return None
 
-    def get_playlist_tracks(self, playlist_id, limit=100):
-        """Get tracks from a specific playlist"""
+    def get_playlist_tracks(self, playlist_id, limit=None):
+        """Get tracks from a specific playlist using pagination (all tracks unless limited)"""
         if not self.sp:
             return None
 
         try:
-            results = self.sp.playlist_tracks(playlist_id, limit=limit)
             tracks = []
+            offset = 0
+            batch_size = 100
 
-            for item in results['items']:
-                if item['track'] and item['track']['type'] == 'track':
-                    track = item['track']
-
-                    # Get album artwork
-                    album_image_url = None
-                    if track['album']['images']:
-                        images = track['album']['images']
-                        if len(images) >= 2:
-                            album_image_url = images[1]['url']  # Medium size
-                        else:
-                            album_image_url = images[0]['url']
-
-                    # Audio features require additional permissions, skip for now
-                    audio_features = None
-
-                    track_data = {
-                        'name': track['name'],
-                        'artist': track['artists'][0]['name'] if track['artists'] else 'Unknown',
-                        'album': track['album']['name'],
-                        'duration_ms': track['duration_ms'],
-                        'popularity': track['popularity'],
-                        'track_id': track['id'],
-                        'album_image_url': album_image_url,
-                        'added_at': item['added_at'],
-                        'preview_url': track.get('preview_url'),
-                        'spotify_url': track['external_urls']['spotify']
-                    }
+            while True:
+                page_size = batch_size if limit is None else min(batch_size, limit - offset)
+                # Only request the fields we use; full track objects carry large available_markets arrays
+                results = self.sp.playlist_tracks(
+                    playlist_id,
+                    limit=page_size,
+                    offset=offset,
+                    fields=PLAYLIST_TRACK_FIELDS,
+                    additional_types=('track',)
+                )
 
-                    # Add audio features if available
-                    if audio_features:
-                        track_data.update({
-                            'danceability': audio_features.get('danceability'),
-                            'energy': audio_features.get('energy'),
-                            'valence': audio_features.get('valence'),
-                            'tempo': audio_features.get('tempo'),
-                            'acousticness': audio_features.get('acousticness'),
-                            'instrumentalness': audio_features.get('instrumentalness'),
-                            'speechiness': audio_features.get('speechiness')
-                        })
+                for item in results['items']:
+                    if item['track'] and item['track']['type'] == 'track':
+                        track = item['track']
+
+                        # Get album artwork
+                        album_image_url = None
+                        if track['album']['images']:
+                            images = track['album']['images']
+                            if len(images) >= 2:
+                                album_image_url = images[1]['url']  # Medium size
+                            else:
+                                album_image_url = images[0]['url']
+
+                        # Audio features require additional permissions, skip for now
+                        audio_features = None
+
+                        track_data = {
+                            'name': track['name'],
+                            'artist': track['artists'][0]['name'] if track['artists'] else 'Unknown',
+                            'album': track['album']['name'],
+                            'duration_ms': track['duration_ms'],
+                            'popularity': track['popularity'],
+                            'track_id': track['id'],
+                            'album_image_url': album_image_url,
+                            'added_at': item['added_at'],
+                            'preview_url': track.get('preview_url'),
+                            'spotify_url': track['external_urls']['spotify']
+                        }
+
+                        # Add audio features if available
+                        if audio_features:
+                            track_data.update({
+                                'danceability': audio_features.get('danceability'),
+                                'energy': audio_features.get('energy'),
+                                'valence': audio_features.get('valence'),
+                                'tempo': audio_features.get('tempo'),
+                                'acousticness': audio_features.get('acousticness'),
+                                'instrumentalness': audio_features.get('instrumentalness'),
+                                'speechiness': audio_features.get('speechiness')
+                            })
+
+                        tracks.append(track_data)
+
+                # Check if we have more tracks
+                if len(results['items']) < page_size:
+                    break
 
-                    tracks.append(track_data)
+                offset += page_size
+                if limit is not None and offset >= limit:
+                    break
 
             return pd.DataFrame(tracks)
 
@@ -385,34 +565,48 @@ class SpotifyAPI:
             st.error(f"Error fetching playlist tracks: {e}")
             return None
 
+    def build_artwork_index(self):
+        """Map (track, artist) to album artwork across all of the user's playlists in one pass"""
+        index = {}
+        playlists = self.get_user_playlists()
+        if playlists is not None and not playlists.empty:
+            for playlist_id in playlists['playlist_id']:
+                playlist_tracks = self.get_playlist_tracks(playlist_id, limit=50)
+                if playlist_tracks is None or playlist_tracks.empty or 'album_image_url' not in playlist_tracks.columns:
+                    continue
+
+                for name, artist, image in zip(playlist_tracks['name'], playlist_tracks['artist'],
+                                               playlist_tracks['album_image_url']):
+                    key = (name.lower(), artist.lower())
+                    # First playlist that has artwork for the track wins
+                    if key not in index and pd.notna(image):
+                        index[key] = image
+                        self.artwork_cache.set_track_artwork(name, artist, image)
+
+        self.artwork_cache.save_cache()
+        self._artwork_index = index
+        return index
+
+    def invalidate_artwork_index(self):
+        """Drop the playlist artwork index so the next lookup rebuilds it"""
+        self._artwork_index = None
+
     def find_track_artwork_from_playlists(self, track_name, artist_name):
         """Search for track artwork by looking through user's playlists"""
         if not self.sp:
             return None
 
         try:
-            # Get user playlists
-            playlists = self.get_user_playlists()
-            if playlists is None or playlists.empty:
-                return None
-
-            # Search through playlists for the track
-            for _, playlist in playlists.iterrows():
-                playlist_tracks = self.get_playlist_tracks(playlist['playlist_id'], limit=50)
-                if playlist_tracks is not None and not playlist_tracks.empty:
-                    # Look for matching track
-                    matching_tracks = playlist_tracks[
-                        (playlist_tracks['name'].str.lower() == track_name.lower()) &
-                        (playlist_tracks['artist'].str.lower() == artist_name.lower())
-                    ]
-
-                    if not matching_tracks.empty and 'album_image_url' in matching_tracks.columns:
-                        album_image = matching_tracks['album_image_url'].iloc[0]
-                        if pd.notna(album_image):
-                            return album_image
+            # Artwork indexed by an earlier run is persisted in the artwork cache
+            cached = self.artwork_cache.get_track_artwork(track_name, artist_name)
+            if cached and cached.get('artwork_url'):
+                return cached['artwork_url']
 
-            return None
+            if self._artwork_index is None:
+                self.build_artwork_index()
+
+            return self._artwork_index.get((track_name.lower(), artist_name.lower()))
 
         except Exception as e:
             # Silently fail and return None
-            return None
\ No newline at end of file
+            return None
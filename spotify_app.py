@@ -1,9 +1,98 @@
+import base64
+import gc
+import importlib
+import threading
+from pathlib import Path
+
 import streamlit as st
-from shared_components import render_footer
+
+# Custom CSS for the landing page
+_STYLE_BLOCK = """
+<style>
+.main-header {
+    font-size: 3rem;
+    color: #1DB954;
+    text-align: center;
+    font-weight: bold;
+    margin-bottom: 2rem;
+}
+.spotify-logo {
+    text-align: center;
+    margin: 2rem 0;
+}
+.navigation-card {
+    background-color: #191414;
+    padding: 2rem;
+    border-radius: 20px;
+    text-align: center;
+    margin: 1rem;
+    border: 2px solid #1DB954;
+}
+.navigation-card:hover {
+    background-color: #1DB954;
+    cursor: pointer;
+}
+.nav-button {
+    background-color: #1DB954;
+    color: white;
+    padding: 1rem 2rem;
+    border-radius: 50px;
+    border: none;
+    font-size: 1.2rem;
+    font-weight: bold;
+    margin: 1rem;
+    cursor: pointer;
+    width: 300px;
+}
+.nav-button:hover {
+    background-color: #1ed760;
+}
+</style>
+"""
+
+# Logo inlined as a data URI so the header needs no extra image request
+_LOGO_B64 = base64.b64encode((Path(__file__).parent / "logo" / "spotiboti_icon.png").read_bytes()).decode()
+
+# Landing page header: title, logo and the heading above the navigation
+_HEADER_HTML = (
+    '<div class="main-header">Sara\'s Spotify</div>'
+    '<div class="spotify-logo">'
+    f'<img src="data:image/png;base64,{_LOGO_B64}" width="150" alt="SpotiBoti Icon">'
+    '</div>'
+    '<br><br>'
+    '<h3 style="text-align: center; color: #1DB954; margin-bottom: 1.5rem;">Explore My Music</h3>'
+)
+
+# Heavy modules the pages under pages/ import on first visit. The root spotiboti module is left out:
+# its groq-missing st.error runs at import time and would be dropped outside a script context
+_PAGE_DEPENDENCIES = ("pandas", "numpy", "plotly.express", "spotify_api", "spotify_data_query", "spotiboti_memory")
+
+# Landing page navigation: (page, label, help)
+_NAV = (
+    ("pages/spotiboti.py", "🤖 Chat with SpotiBoti", "Ask me anything about my music!"),
+    ("pages/streaming_history.py", "📊 Streaming History", "Deep dive into my listening data"),
+    ("pages/song_analysis.py", "🎵 Song Analysis", "Analyze individual tracks"),
+    ("pages/recommender_system.py", "🎯 Get Recommendations", "Discover new music"),
+)
+
+
+@st.cache_resource
+def _inject_css():
+    """Emit the landing page styles; cached so reruns replay the element instead of rebuilding it"""
+    st.html(_STYLE_BLOCK)
+
+
+@st.fragment
+def _render_nav():
+    """Navigation grid; as a fragment, interactions inside it rerun only this block"""
+    for col, (page, label, help_text) in zip(st.columns(len(_NAV)), _NAV):
+        with col:
+            st.page_link(page, label=label, help=help_text, use_container_width=True)
+
 
 class SpotifyApp:
-    def __init__(self):
-        # Page config
+    def setup_page(self):
+        # Page config and styles are per-run, so they are emitted on every rerun
         st.set_page_config(
             page_title="Sara's Spotify",
             page_icon="logo/spotiboti_no_text.png",
@@ -14,90 +103,50 @@ class SpotifyApp:
 
     def setup_styles(self):
         # Custom CSS for better styling
-        st.markdown("""
-        <style>
-        .main-header {
-            font-size: 3rem;
-            color: #1DB954;
-            text-align: center;
-            font-weight: bold;
-            margin-bottom: 2rem;
-        }
-        .spotify-logo {
-            text-align: center;
-            margin: 2rem 0;
-        }
-        .navigation-card {
-            background-color: #191414;
-            padding: 2rem;
-            border-radius: 20px;
-            text-align: center;
-            margin: 1rem;
-            border: 2px solid #1DB954;
-        }
-        .navigation-card:hover {
-            background-color: #1DB954;
-            cursor: pointer;
-        }
-        .nav-button {
-            background-color: #1DB954;
-            color: white;
-            padding: 1rem 2rem;
-            border-radius: 50px;
-            border: none;
-            font-size: 1.2rem;
-            font-weight: bold;
-            margin: 1rem;
-            cursor: pointer;
-            width: 300px;
-        }
-        .nav-button:hover {
-            background-color: #1ed760;
-        }
-        </style>
-        """, unsafe_allow_html=True)
+        _inject_css()
 
     def render_main_page(self):
-        # Header
-        st.markdown('<div class="main-header">Sara\'s Spotify</div>', unsafe_allow_html=True)
-
-        # Spotify Logo
-        st.markdown("""
-        <div class="spotify-logo">
-            <img src="https://upload.wikimedia.org/wikipedia/commons/thumb/1/19/Spotify_logo_without_text.svg/512px-Spotify_logo_without_text.svg.png" width="150" alt="Spotify Icon">
-        </div>
-        """, unsafe_allow_html=True)
+        self.setup_page()
 
-        # Navigation to other features
-        st.markdown("<br><br>", unsafe_allow_html=True)
+        # Header, logo and section heading in a single element
+        st.html(_HEADER_HTML)
 
-        # Feature navigation section
-        st.markdown('<h3 style="text-align: center; color: #1DB954; margin-bottom: 1.5rem;">Explore My Music</h3>', unsafe_allow_html=True)
+        # Feature navigation
+        _render_nav()
 
-        col1, col2, col3, col4 = st.columns(4)
-
-        with col1:
-            if st.button("🤖 Chat with SpotiBoti", key="spotiboti_nav", help="Ask me anything about my music!", use_container_width=True):
-                st.switch_page("pages/spotiboti.py")
-
-        with col2:
-            if st.button("📊 Streaming History", key="history_nav", help="Deep dive into my listening data", use_container_width=True):
-                st.switch_page("pages/streaming_history.py")
+        # Add footer (imported here so it stays off the landing page's import path)
+        from shared_components import render_footer
+        render_footer()
 
-        with col3:
-            if st.button("🎵 Song Analysis", key="analysis_nav", help="Analyze individual tracks", use_container_width=True):
-                st.switch_page("pages/song_analysis.py")
+@st.cache_resource
+def get_app():
+    """Shared SpotifyApp instance, built once per server process"""
+    return SpotifyApp()
 
-        with col4:
-            if st.button("🎯 Get Recommendations", key="recs_nav", help="Discover new music", use_container_width=True):
-                st.switch_page("pages/recommender_system.py")
+@st.cache_resource
+def _prewarm_page_imports():
+    """Import the pages' dependencies in the background, once per server process"""
+    def prewarm():
+        for module in _PAGE_DEPENDENCIES:
+            try:
+                importlib.import_module(module)
+            except Exception:
+                pass
 
-        # Add footer
-        render_footer()
+    thread = threading.Thread(target=prewarm, daemon=True)
+    thread.start()
+    return thread
 
 def main():
-    app = SpotifyApp()
-    app.render_main_page()
+    # The landing render is short and allocation-heavy; skip cyclic GC passes during it
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        get_app().render_main_page()
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    _prewarm_page_imports()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
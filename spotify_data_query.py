@@ -1,25 +1,311 @@
 import pandas as pd
-import json
+import numpy as np
+import os
 import re
+from functools import lru_cache
+from data_builder import load_json_file
+
+try:
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+DATA_FILE = 'data/enriched_spotify_data.json'
+# Typed columnar copy of DATA_FILE, rebuilt whenever the JSON is newer
+PARQUET_FILE = 'data/enriched_spotify_data.parquet'
+# The only columns the queries read; the rest of each record is never loaded into the engine
+QUERY_COLUMNS = ('ts', 'ms_played', 'master_metadata_track_name', 'master_metadata_album_artist_name', 'genres')
+
+# Query patterns, compiled once. Patterns other than _SONG_BY_ARTIST_RE are matched against the lowercased query.
+_SONG_BY_ARTIST_RE = re.compile(r'([^\\n]+?)\\s+by\\s+([^\\n]+?)(?:[\\s\\n]|$)', re.IGNORECASE)
+
+_ARTIST_SONG_PATTERNS = tuple(re.compile(p) for p in (
+    r'(?:top|favorite|best|fave)\s+\d+\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)\s+songs?',  # "top 5 j cole songs" - with number
+    r'(?:top|favorite|best|fave)\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)\s+songs?',  # "top j cole songs" - without number
+    r'(?:my|give me|show me)\s+(?:my\s+)?(?:top|favorite|best|fave)?\s*\d+\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)\s+songs?',  # "give me my top 5 j cole songs"
+    r'(?:my|give me|show me)\s+(?:my\s+)?(?:top|favorite|best|fave)?\s*([a-zA-Z]+(?:\s+[a-zA-Z]+)*)\s+songs?',  # "give me j cole songs"
+    r'([a-zA-Z]+(?:\s+[a-zA-Z]+)*)\s+songs?',  # "j cole songs" or "tyla songs"
+    r'songs?\s+by\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)',  # "songs by j cole"
+))
+
+_FIRST_SONG_PATTERNS = tuple(re.compile(p) for p in (
+    r'(?:first|earliest)\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)\s+song',  # "first tyla song"
+    r'(?:what|which)\s+(?:is|was)\s+(?:the\s+)?(?:first|earliest)\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)\s+song',  # "what is the first tyla song"
+    r'(?:first|earliest)\s+song\s+(?:by|from)\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)',  # "first song by tyla"
+))
+
+_FIRST_GENRE_PATTERNS = tuple(re.compile(p) for p in (
+    r'(?:first|earliest)\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)\s+song',  # "first afrobeats song"
+    r'(?:what|which)\s+(?:is|was)\s+(?:the\s+)?(?:first|earliest)\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)\s+song',  # "what is the first afrobeats song"
+))
+
+_LAST_SONG_PATTERNS = tuple(re.compile(p) for p in (
+    r'(?:last|latest|most recent)\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)\s+song',  # "last tyla song"
+    r'(?:what|which)\s+(?:is|was)\s+(?:the\s+)?(?:last|latest|most recent)\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)\s+song',  # "what is the last tyla song"
+    r'(?:last|latest|most recent)\s+song\s+(?:by|from)\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)',  # "last song by tyla"
+    r'(?:and\s+)?(?:my\s+)?(?:last|latest)\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)\s+song',  # "and my last drake song"
+))
+
+_LAST_GENRE_PATTERNS = tuple(re.compile(p) for p in (
+    r'(?:last|latest|most recent)\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)\s+song',  # "last afrobeats song"
+    r'(?:what|which)\s+(?:is|was)\s+(?:the\s+)?(?:last|latest|most recent)\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)\s+song',  # "what is the last afrobeats song"
+))
+
+# Each family fused into one alternation, so a query that matches none of its patterns is rejected in a single scan
+_ARTIST_SONG_ANY = re.compile('|'.join(p.pattern for p in _ARTIST_SONG_PATTERNS))
+_FIRST_SONG_ANY = re.compile('|'.join(p.pattern for p in _FIRST_SONG_PATTERNS + _FIRST_GENRE_PATTERNS))
+_LAST_SONG_ANY = re.compile('|'.join(p.pattern for p in _LAST_SONG_PATTERNS + _LAST_GENRE_PATTERNS))
+
+# Day numbers like "March 15", "15th", "on the 3rd"; group 2 is set for "17th of" forms, which take precedence
+_DAY_RE = re.compile(r'\b(\d{1,2})((?:st|nd|rd|th)\s+of\b)?(?:st|nd|rd|th)?\b')
+
+# Phrases that ask what was played on a day/period (including duration queries), matched in one scan
+_DAILY_LISTENING_RE = re.compile('|'.join(map(re.escape, (
+    'what did i listen', 'listened to on', 'music on', 'listening history',
+    'how long did i listen', 'how much music', 'music for on',
+))))
+
+MS_PER_HOUR = 1000 * 60 * 60
+
+DAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+# Words the artist/genre patterns can capture that are never names
+_GENERIC_WORDS = ('my', 'me', 'favorite', 'top', 'best', 'fave', 'all', 'the')
+
+_MONTHS = {
+    'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6,
+    'july': 7, 'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12
+}
+
+# Number of (column, period) top-1 results kept between queries
+TOP_CACHE_SIZE = 128
+# Number of daily listening / period summary results kept between queries
+LISTENING_CACHE_SIZE = 64
+# Number of artist-name probe outcomes remembered before the memo is reset
+ARTIST_PROBE_CACHE_SIZE = 4096
+
+def _date_keys(values):
+    """Days since the Unix epoch (int64) for datetime64 values"""
+    return values.astype('datetime64[D]').astype('int64')
+
+def _month_keys(values):
+    """Months since the Unix epoch (int64) for datetime64 values"""
+    return values.astype('datetime64[M]').astype('int64')
+
+def _hours_played(plays):
+    """Total listening hours of the plays, converted from ms_played only after summing"""
+    return plays['ms_played'].sum() / MS_PER_HOUR
+
+def _format_date_key(date_key):
+    """ISO date string (YYYY-MM-DD) for a days-since-epoch key"""
+    return str(np.datetime64(int(date_key), 'D'))
+
+def _top_value_counts(column, limit):
+    """Top `limit` value counts as a dict, leaving out unused categories of a categorical column"""
+    counts = column.value_counts()
+    return counts[counts > 0].head(limit).to_dict()
+
+def _code_counts(column):
+    """Play count per category code of a categorical column, missing values left out"""
+    codes = column.cat.codes.to_numpy()
+    return np.bincount(codes[codes >= 0], minlength=len(column.cat.categories))
+
+def _top_code_counts(categories, counts, limit):
+    """Top `limit` categories by count as a dict, most played first and ties in category order"""
+    order = np.argsort(-counts, kind='stable')[:limit]
+    return {categories[code]: int(counts[code]) for code in order if counts[code] > 0}
+
+def _candidate_patterns(query_lower, family_re, patterns):
+    """Patterns of a family worth trying in order; empty when the fused family pattern finds nothing"""
+    return patterns if family_re.search(query_lower) else ()
+
+def _load_plays():
+    """Load the enriched plays with ts parsed, from the Parquet copy when it is up to date"""
+    if (PYARROW_AVAILABLE and os.path.exists(PARQUET_FILE)
+            and os.path.getmtime(PARQUET_FILE) >= os.path.getmtime(DATA_FILE)):
+        stored = pq.read_schema(PARQUET_FILE).names
+        return pd.read_parquet(PARQUET_FILE, columns=[col for col in QUERY_COLUMNS if col in stored])
+
+    df = pd.DataFrame(load_json_file(DATA_FILE))
+    df = df[[col for col in QUERY_COLUMNS if col in df.columns]]
+    df['ts'] = pd.to_datetime(df['ts'], format='ISO8601')
+
+    if PYARROW_AVAILABLE:
+        try:
+            df.to_parquet(PARQUET_FILE, index=False)
+        except Exception as e:
+            print(f"⚠️  Could not write {PARQUET_FILE}: {e}")
+    return df
 
 class SpotifyDataQuery:
     def __init__(self):
-        with open('data/enriched_spotify_data.json', 'r') as f:
-            self.df = pd.DataFrame(json.load(f))
-        self.df['ts'] = pd.to_datetime(self.df['ts'])
-        self.df['date'] = self.df['ts'].dt.date
+        self.df = _load_plays()
+        # Chronological order, so the first/last play of any slice is positional
+        self.df = self.df.sort_values('ts', kind='mergesort').reset_index(drop=True)
+        # Play durations as int32 (a play is far shorter than 2**31 ms), present on every row;
+        # pandas sums int32 into int64, so hour totals stay exact
+        if 'ms_played' not in self.df.columns:
+            self.df['ms_played'] = 0
+        self.df['ms_played'] = self.df['ms_played'].fillna(0).astype('int32')
+        # Calendar day as days since epoch; int64 compares and groups much faster than date objects
+        self.df['date_key'] = _date_keys(self.df['ts'].values)
         self.df['year'] = self.df['ts'].dt.year
-        # Convert ms_played to hours_played for easier calculations
-        if 'ms_played' in self.df.columns:
-            self.df['hours_played'] = self.df['ms_played'] / (1000 * 60 * 60)  # ms to hours
+        self._date_key_values = self.df['date_key'].to_numpy()
+        self._years = tuple((str(year), year) for year in sorted(self.df['year'].unique()))
+        # Hour of day and weekday (Monday=0) per row, for the peak-time stats
+        self._hours = self.df['ts'].dt.hour.to_numpy()
+        self._weekdays = self.df['ts'].dt.dayofweek.to_numpy()
+
+        # Lowercased name columns, built once for the matching done on every query.
+        # As categoricals, equality tests compare integer codes.
+        self._artist_lower = self.df['master_metadata_album_artist_name'].fillna('').str.lower().astype('category')
+        self._track_lower = self.df['master_metadata_track_name'].fillna('').str.lower().astype('category')
+        self._artist_set = frozenset(self._artist_lower.unique()) - {''}
+        # All names in one newline-joined string, so a substring probe is a single C-level search
+        self._artist_blob = '\n'.join(self._artist_set)
+        # Outcome of every name probed so far; the same candidates recur across pattern families and queries
+        self._artist_probes = {}
+
+        # Artist and track names repeat heavily; categorical codes make counting and comparisons integer work.
+        # Categories keep first-appearance order so ties in value_counts break as they did on plain strings.
+        for col in ('master_metadata_album_artist_name', 'master_metadata_track_name'):
+            self.df[col] = pd.Categorical(self.df[col], categories=self.df[col].dropna().unique())
+
+        # One row per (play, genre), split once here instead of on every genre query
+        self._genres_long = None
+        if 'genres' in self.df.columns:
+            genres = self.df['genres']
+            listed = genres[genres.notna() & (genres != '') & (genres != 'Unknown')]
+            exploded = listed.str.split(',').explode().str.strip()
+            self._genre_rows = exploded.index.to_numpy()
+            self._genres_long = pd.Categorical(exploded.to_numpy(), categories=exploded.unique())
+            self._genre_categories_lower = self._genres_long.categories.str.lower()
+
+        # Lowercased artist categories, for substring matching over unique names instead of rows
+        self._artist_categories_lower = self.df['master_metadata_album_artist_name'].cat.categories.str.lower()
+        # Row positions grouped by artist code: code c's plays are _artist_order[_artist_bounds[c]:_artist_bounds[c + 1]]
+        artist_codes = self.df['master_metadata_album_artist_name'].cat.codes.to_numpy()
+        self._artist_order = np.argsort(artist_codes, kind='stable')
+        self._artist_bounds = np.searchsorted(artist_codes[self._artist_order],
+                                              np.arange(len(self._artist_categories_lower) + 1))
+
+        # Plays per (month, artist) and (month, track), so whole-month periods are counted from the roll-up
+        month_keys = _month_keys(self.df['ts'].values)
+        self._monthly_plays = {}
+        for col in ('master_metadata_album_artist_name', 'master_metadata_track_name'):
+            codes = self.df[col].cat.codes.to_numpy()
+            named = codes >= 0
+            rollup = pd.Series(1, index=pd.MultiIndex.from_arrays([month_keys[named], codes[named]])).groupby(level=[0, 1]).size()
+            self._monthly_plays[col] = (rollup.index.get_level_values(0).to_numpy(),
+                                        rollup.index.get_level_values(1).to_numpy(),
+                                        rollup.to_numpy())
+
+        # Month spans (first, end) of the whole-month periods seen by _filter_by_time, keyed by period_info
+        self._period_months = {"All time": (month_keys[0], month_keys[-1] + 1)}
+
+        # Top-1 results per (column, period); the data is read-only so they never go stale
+        self._top_cache = {}
+        # Daily listening / period summary results per period, for the same reason
+        self._listening_cache = {}
+
+    def _rows_between(self, first_key, end_key):
+        """Plays on days first_key <= date_key < end_key; the frame is sorted, so this is a binary-searched slice"""
+        lo, hi = np.searchsorted(self._date_key_values, (first_key, end_key))
+        return self.df.iloc[lo:hi]
+
+    def _peak_times(self, filtered_data):
+        """Busiest hour of day and weekday name for the filtered plays"""
+        if filtered_data.empty:
+            return 0, 'Unknown'
+        rows = filtered_data.index.to_numpy()
+        peak_hour = np.bincount(self._hours[rows], minlength=24).argmax()
+        peak_day = DAY_NAMES[np.bincount(self._weekdays[rows], minlength=7).argmax()]
+        return peak_hour, peak_day
+
+    def _top_value(self, filtered_data, period_info, column):
+        """Most played value of a column and its play count for a period, memoized per (column, period)"""
+        key = (column, period_info)
+        cached = self._top_cache.get(key)
+        if cached is None:
+            span = self._period_months.get(period_info)
+            if span is not None:
+                # Whole months: add up the monthly roll-up instead of touching the plays
+                months, codes, plays = self._monthly_plays[column]
+                lo, hi = np.searchsorted(months, span)
+                counts = np.bincount(codes[lo:hi], weights=plays[lo:hi]).astype('int64')
+            else:
+                # Histogram of category codes; argmax finds the top value without sorting all counts
+                codes = filtered_data[column].cat.codes.to_numpy()
+                counts = np.bincount(codes[codes >= 0])
+            top = counts.argmax()
+            cached = (self.df[column].cat.categories[top], counts[top])
+            if len(self._top_cache) >= TOP_CACHE_SIZE:
+                self._top_cache.pop(next(iter(self._top_cache)))
+            self._top_cache[key] = cached
+        return cached
+
+    def _genre_counts(self, filtered_data):
+        """Genre play counts for the filtered rows, most played first"""
+        if filtered_data is self.df:
+            genres = self._genres_long
         else:
-            self.df['hours_played'] = 0  # fallback
+            # Row labels are positions (the frame keeps its RangeIndex), so a boolean row mask selects the genres
+            row_mask = np.zeros(len(self.df), dtype=bool)
+            row_mask[filtered_data.index.to_numpy()] = True
+            genres = self._genres_long[row_mask[self._genre_rows]]
+        counts = pd.Series(genres).value_counts()
+        return counts[counts > 0]
+
+    def _artist_rows(self, filtered_data, artist_name):
+        """Rows of filtered_data whose artist contains artist_name, falling back to common name variations"""
+        if filtered_data.empty:
+            return filtered_data
+        # filtered_data is a contiguous slice of the frame, so its row positions are a range
+        first, end = filtered_data.index[0], filtered_data.index[-1] + 1
+        for name in (artist_name.lower(), *self._generate_artist_name_variations(artist_name)):
+            # Memoized probe first, so only candidates known to match pay for a scan of the artist names
+            if not self._artist_exists(name):
+                continue
+            # Match against the unique artist names, then select rows by category code
+            wanted = np.flatnonzero(self._artist_categories_lower.str.contains(name, regex=False))
+            if len(wanted):
+                # The artists' plays come from the precomputed groups, trimmed to the period by binary search
+                rows = np.concatenate([self._artist_order[self._artist_bounds[code]:self._artist_bounds[code + 1]]
+                                       for code in wanted])
+                if len(wanted) > 1:
+                    rows.sort()
+                lo, hi = np.searchsorted(rows, (first, end))
+                if hi > lo:
+                    return self.df.iloc[rows[lo:hi]]
+        return filtered_data.iloc[:0]
+
+    def _genre_mask(self, filtered_data, genre_name):
+        """Boolean mask over filtered_data of plays with a genre containing genre_name as a whole word"""
+        # Whole words only, so "rap" finds "rap" and "uk rap" but not "trap"
+        pattern = r'(?<![a-z0-9])' + re.escape(genre_name.lower()) + r'(?![a-z0-9])'
+        matching = np.asarray(self._genre_categories_lower.str.contains(pattern))
+        tagged = np.zeros(len(self.df), dtype=bool)
+        tagged[self._genre_rows[matching[self._genres_long.codes]]] = True
+        return tagged[filtered_data.index.to_numpy()]
+
+    def _artist_exists(self, name_lower):
+        """Whether any artist name equals or contains the lowercased name"""
+        found = self._artist_probes.get(name_lower)
+        if found is None:
+            # Query-derived names never contain a newline, so a hit cannot span two artists
+            found = name_lower in self._artist_set or name_lower in self._artist_blob
+            if len(self._artist_probes) >= ARTIST_PROBE_CACHE_SIZE:
+                self._artist_probes.clear()
+            self._artist_probes[name_lower] = found
+        return found
 
     def analyze_query(self, query):
         """Simple query analysis - just look at the data directly"""
+        query_lower = query.lower()
 
         # "Song by Artist" pattern
-        song_by_artist = re.search(r'([^\\n]+?)\\s+by\\s+([^\\n]+?)(?:[\\s\\n]|$)', query, re.IGNORECASE)
+        song_by_artist = _SONG_BY_ARTIST_RE.search(query)
         if song_by_artist:
             song, artist = song_by_artist.groups()
             return self._query_song_by_artist(song.strip(), artist.strip())
@@ -29,24 +315,15 @@ class SpotifyDataQuery:
 
         # Check for artist-specific song queries FIRST (e.g., "my top j cole songs", "favorite drake songs")
         # This must come before general song/artist detection to avoid conflicts
-        artist_song_patterns = [
-            r'(?:top|favorite|best|fave)\s+\d+\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)\s+songs?',  # "top 5 j cole songs" - with number
-            r'(?:top|favorite|best|fave)\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)\s+songs?',  # "top j cole songs" - without number
-            r'(?:my|give me|show me)\s+(?:my\s+)?(?:top|favorite|best|fave)?\s*\d+\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)\s+songs?',  # "give me my top 5 j cole songs"
-            r'(?:my|give me|show me)\s+(?:my\s+)?(?:top|favorite|best|fave)?\s*([a-zA-Z]+(?:\s+[a-zA-Z]+)*)\s+songs?',  # "give me j cole songs"
-            r'([a-zA-Z]+(?:\s+[a-zA-Z]+)*)\s+songs?',  # "j cole songs" or "tyla songs"
-            r'songs?\s+by\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)',  # "songs by j cole"
-        ]
-
         detected_artist = None
-        for pattern in artist_song_patterns:
-            match = re.search(pattern, query.lower())
+        for pattern in _candidate_patterns(query_lower, _ARTIST_SONG_ANY, _ARTIST_SONG_PATTERNS):
+            match = pattern.search(query_lower)
             if match:
                 potential_artist = match.group(1).strip()
                 # Filter out generic words that aren't artist names
-                if potential_artist not in ['my', 'me', 'favorite', 'top', 'best', 'fave', 'all', 'the']:
+                if potential_artist not in _GENERIC_WORDS:
                     # Check if this artist exists in our data (exact match first)
-                    if self.df['master_metadata_album_artist_name'].str.lower().str.contains(potential_artist, case=False, na=False).any():
+                    if self._artist_exists(potential_artist):
                         detected_artist = potential_artist
                         break
 
@@ -54,7 +331,7 @@ class SpotifyDataQuery:
                     variations = self._generate_artist_name_variations(potential_artist)
 
                     for variation in variations:
-                        if self.df['master_metadata_album_artist_name'].str.lower().str.contains(variation.lower(), case=False, na=False).any():
+                        if self._artist_exists(variation):
                             detected_artist = potential_artist  # Keep original for user feedback
                             break
 
@@ -65,80 +342,58 @@ class SpotifyDataQuery:
             return self._get_artist_songs(filtered_data, period_info, detected_artist)
 
         # Check for "first song" queries
-        first_song_patterns = [
-            r'(?:first|earliest)\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)\s+song',  # "first tyla song"
-            r'(?:what|which)\s+(?:is|was)\s+(?:the\s+)?(?:first|earliest)\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)\s+song',  # "what is the first tyla song"
-            r'(?:first|earliest)\s+song\s+(?:by|from)\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)',  # "first song by tyla"
-        ]
-
-        for pattern in first_song_patterns:
-            match = re.search(pattern, query.lower())
+        for pattern in _candidate_patterns(query_lower, _FIRST_SONG_ANY, _FIRST_SONG_PATTERNS):
+            match = pattern.search(query_lower)
             if match:
                 potential_artist = match.group(1).strip()
-                if potential_artist not in ['my', 'me', 'favorite', 'top', 'best', 'fave', 'all', 'the']:
+                if potential_artist not in _GENERIC_WORDS:
                     # Check if this artist exists in our data
-                    if self.df['master_metadata_album_artist_name'].str.lower().str.contains(potential_artist, case=False, na=False).any():
+                    if self._artist_exists(potential_artist):
                         return self._get_first_song_by_artist(filtered_data, period_info, potential_artist)
 
                     # Try variations
                     variations = self._generate_artist_name_variations(potential_artist)
                     for variation in variations:
-                        if self.df['master_metadata_album_artist_name'].str.lower().str.contains(variation.lower(), case=False, na=False).any():
+                        if self._artist_exists(variation):
                             return self._get_first_song_by_artist(filtered_data, period_info, potential_artist)
 
         # Check for first song in genre queries
-        first_genre_patterns = [
-            r'(?:first|earliest)\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)\s+song',  # "first afrobeats song"
-            r'(?:what|which)\s+(?:is|was)\s+(?:the\s+)?(?:first|earliest)\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)\s+song',  # "what is the first afrobeats song"
-        ]
-
-        for pattern in first_genre_patterns:
-            match = re.search(pattern, query.lower())
+        for pattern in _candidate_patterns(query_lower, _FIRST_SONG_ANY, _FIRST_GENRE_PATTERNS):
+            match = pattern.search(query_lower)
             if match:
                 potential_genre = match.group(1).strip()
-                if potential_genre not in ['my', 'me', 'favorite', 'top', 'best', 'fave', 'all', 'the']:
+                if potential_genre not in _GENERIC_WORDS:
                     return self._get_first_song_by_genre(filtered_data, period_info, potential_genre)
 
         # Check for "last song" queries
-        last_song_patterns = [
-            r'(?:last|latest|most recent)\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)\s+song',  # "last tyla song"
-            r'(?:what|which)\s+(?:is|was)\s+(?:the\s+)?(?:last|latest|most recent)\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)\s+song',  # "what is the last tyla song"
-            r'(?:last|latest|most recent)\s+song\s+(?:by|from)\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)',  # "last song by tyla"
-            r'(?:and\s+)?(?:my\s+)?(?:last|latest)\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)\s+song',  # "and my last drake song"
-        ]
-
-        for pattern in last_song_patterns:
-            match = re.search(pattern, query.lower())
+        for pattern in _candidate_patterns(query_lower, _LAST_SONG_ANY, _LAST_SONG_PATTERNS):
+            match = pattern.search(query_lower)
             if match:
                 potential_artist = match.group(1).strip()
-                if potential_artist not in ['my', 'me', 'favorite', 'top', 'best', 'fave', 'all', 'the']:
+                if potential_artist not in _GENERIC_WORDS:
                     # Check if this artist exists in our data
-                    if self.df['master_metadata_album_artist_name'].str.lower().str.contains(potential_artist, case=False, na=False).any():
+                    if self._artist_exists(potential_artist):
                         return self._get_last_song_by_artist(filtered_data, period_info, potential_artist)
 
                     # Try variations
                     variations = self._generate_artist_name_variations(potential_artist)
                     for variation in variations:
-                        if self.df['master_metadata_album_artist_name'].str.lower().str.contains(variation.lower(), case=False, na=False).any():
+                        if self._artist_exists(variation):
                             return self._get_last_song_by_artist(filtered_data, period_info, potential_artist)
 
         # Check for last song in genre queries
-        last_genre_patterns = [
-            r'(?:last|latest|most recent)\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)\s+song',  # "last afrobeats song"
-            r'(?:what|which)\s+(?:is|was)\s+(?:the\s+)?(?:last|latest|most recent)\s+([a-zA-Z]+(?:\s+[a-zA-Z]+)*)\s+song',  # "what is the last afrobeats song"
-        ]
-
-        for pattern in last_genre_patterns:
-            match = re.search(pattern, query.lower())
+        for pattern in _candidate_patterns(query_lower, _LAST_SONG_ANY, _LAST_GENRE_PATTERNS):
+            match = pattern.search(query_lower)
             if match:
                 potential_genre = match.group(1).strip()
-                if potential_genre not in ['my', 'me', 'favorite', 'top', 'best', 'fave', 'all', 'the']:
+                if potential_genre not in _GENERIC_WORDS:
                     return self._get_last_song_by_genre(filtered_data, period_info, potential_genre)
 
         # Check for multiple requests (artist AND song)
-        wants_song = any(phrase in query.lower() for phrase in ['favorite song', 'top song', 'best song', 'song'])
-        wants_artist = any(phrase in query.lower() for phrase in ['favorite artist', 'top artist', 'best artist', 'artist'])
-        wants_genre = any(phrase in query.lower() for phrase in ['favorite genre', 'top genre', 'best genre', 'genre'])
+        # 'favorite song', 'top artist', etc. all contain the bare word, so one substring test each is enough
+        wants_song = 'song' in query_lower
+        wants_artist = 'artist' in query_lower
+        wants_genre = 'genre' in query_lower
 
         # Check for AND combinations first (most specific)
         if wants_song and wants_artist and wants_genre:
@@ -157,7 +412,7 @@ class SpotifyDataQuery:
         elif wants_genre:
             return self._get_favorite_genre(filtered_data, period_info)
         # Check for daily listening requests (including duration queries)
-        elif any(phrase in query.lower() for phrase in ['what did i listen', 'listened to on', 'music on', 'listening history', 'how long did i listen', 'how much music', 'music for on']):
+        elif _DAILY_LISTENING_RE.search(query_lower):
             return self._get_daily_listening(filtered_data, period_info)
 
         # Generate simple stats
@@ -169,26 +424,32 @@ class SpotifyDataQuery:
                 'period_info': period_info
             }
 
+        peak_hour, peak_day = self._peak_times(filtered_data)
+        total_hours = _hours_played(filtered_data)
+        # Rows are in date order, so the first/last keys bound the range and day changes count the days
+        days = filtered_data['date_key'].to_numpy()
+        days_listened = np.count_nonzero(np.diff(days)) + 1
+
         return {
             'query': query,
             'analysis_type': 'general',
             'data': {
                 'stats': {
                     'total_plays': len(filtered_data),
-                    'total_hours': filtered_data['hours_played'].sum(),
+                    'total_hours': total_hours,
                     'unique_artists': filtered_data['master_metadata_album_artist_name'].nunique(),
                     'unique_songs': filtered_data['master_metadata_track_name'].nunique(),
-                    'date_range': f"{filtered_data['date'].min()} to {filtered_data['date'].max()}",
-                    'avg_daily_hours': filtered_data.groupby('date')['hours_played'].sum().mean() if not filtered_data.empty else 0,
-                    'most_active_day': filtered_data.groupby(filtered_data['ts'].dt.day_name()).size().idxmax() if not filtered_data.empty else 'Unknown',
-                    'most_active_hour': filtered_data.groupby(filtered_data['ts'].dt.hour).size().idxmax() if not filtered_data.empty else 0
+                    'date_range': f"{_format_date_key(days[0])} to {_format_date_key(days[-1])}",
+                    'avg_daily_hours': total_hours / days_listened,
+                    'most_active_day': peak_day,
+                    'most_active_hour': peak_hour
                 },
-                'top_artists': filtered_data['master_metadata_album_artist_name'].value_counts().head(10).to_dict(),
-                'top_songs': filtered_data['master_metadata_track_name'].value_counts().head(10).to_dict(),
+                'top_artists': _top_value_counts(filtered_data['master_metadata_album_artist_name'], 10),
+                'top_songs': _top_value_counts(filtered_data['master_metadata_track_name'], 10),
                 'top_genres': self._extract_top_genres(filtered_data, 5),
                 'time_patterns': {
-                    'peak_listening_hour': filtered_data.groupby(filtered_data['ts'].dt.hour).size().idxmax() if not filtered_data.empty else 0,
-                    'peak_listening_day': filtered_data.groupby(filtered_data['ts'].dt.day_name()).size().idxmax() if not filtered_data.empty else 'Unknown'
+                    'peak_listening_hour': peak_hour,
+                    'peak_listening_day': peak_day
                 },
                 'total_tracks_in_period': len(filtered_data)
             },
@@ -198,16 +459,16 @@ class SpotifyDataQuery:
     def _query_song_by_artist(self, song, artist):
         """Direct pandas query for song by artist"""
 
+        song_mask = self._track_lower == song.lower()
+        artist_mask = self._artist_lower == artist.lower()
+
         # Exact match query
-        matches = self.df[
-            (self.df['master_metadata_track_name'].str.lower() == song.lower()) &
-            (self.df['master_metadata_album_artist_name'].str.lower() == artist.lower())
-        ]
+        matches = self.df[song_mask & artist_mask]
 
         if matches.empty:
             # Check what actually exists
-            song_matches = self.df[self.df['master_metadata_track_name'].str.lower() == song.lower()]
-            artist_matches = self.df[self.df['master_metadata_album_artist_name'].str.lower() == artist.lower()]
+            song_matches = self.df[song_mask]
+            artist_matches = self.df[artist_mask]
 
             if not song_matches.empty and not artist_matches.empty:
                 actual_artist = song_matches['master_metadata_album_artist_name'].iloc[0]
@@ -228,8 +489,8 @@ class SpotifyDataQuery:
             }
 
         # We found it! Get the actual data
-        first_play = matches['ts'].min()
-        last_play = matches['ts'].max()
+        first_play = matches['ts'].iloc[0]
+        last_play = matches['ts'].iloc[-1]
 
         return {
             'query': f'{song} by {artist}',
@@ -256,8 +517,7 @@ class SpotifyDataQuery:
                 'period_info': period_info
             }
 
-        top_artist = filtered_data['master_metadata_album_artist_name'].value_counts().index[0]
-        play_count = filtered_data['master_metadata_album_artist_name'].value_counts().iloc[0]
+        top_artist, play_count = self._top_value(filtered_data, period_info, 'master_metadata_album_artist_name')
 
         return {
             'query': f'favorite artist in {period_info}',
@@ -273,69 +533,58 @@ class SpotifyDataQuery:
         """Filter data based on time period mentioned in query"""
         query_lower = query.lower()
 
-        # Month mapping
-        months = {
-            'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6,
-            'july': 7, 'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12
-        }
-
         # Extract year
-        years_in_data = sorted(self.df['year'].unique())
         detected_year = None
-        for year in years_in_data:
-            if str(year) in query:
+        for year_str, year in self._years:
+            if year_str in query:
                 detected_year = year
                 break
 
         # Extract month
         detected_month = None
-        for month_name, month_num in months.items():
+        for month_name, month_num in _MONTHS.items():
             if month_name in query_lower:
                 detected_month = month_num
                 break
 
         # Extract day - look for patterns like "March 15", "15th", "on the 3rd", "17th of"
         detected_day = None
-        day_patterns = [
-            r'\b(\d{1,2})(?:st|nd|rd|th)\s+of\b',  # "17th of September"
-            r'\b(\d{1,2})(?:st|nd|rd|th)?\b',      # "15th", "3rd", "22"
-            r'\b(\d{1,2})\s*,?\s*\d{4}',          # "15, 2020" or "15 2020"
-        ]
-
-        for pattern in day_patterns:
-            matches = re.findall(pattern, query)
-            for match in matches:
-                day = int(match)
-                if 1 <= day <= 31:  # Valid day range
+        for match in _DAY_RE.finditer(query):
+            day = int(match.group(1))
+            if 1 <= day <= 31:  # Valid day range
+                if match.group(2):
                     detected_day = day
                     break
-            if detected_day:
-                break
+                if detected_day is None:
+                    detected_day = day
 
         # Filter data based on what we found
         if detected_year and detected_month and detected_day:
             # Specific date
-            target_date = pd.Timestamp(year=detected_year, month=detected_month, day=detected_day).date()
-            filtered_data = self.df[self.df['date'] == target_date]
-            month_name = list(months.keys())[detected_month-1].title()
+            target_key = _date_keys(pd.Timestamp(year=detected_year, month=detected_month, day=detected_day).to_datetime64())
+            filtered_data = self._rows_between(target_key, target_key + 1)
+            month_name = list(_MONTHS)[detected_month-1].title()
             period_info = f"{month_name} {detected_day}, {detected_year}"
         elif detected_year and detected_month:
             # Specific month
-            filtered_data = self.df[(self.df['year'] == detected_year) & (self.df['ts'].dt.month == detected_month)]
-            period_info = f"{list(months.keys())[detected_month-1].title()} {detected_year}"
+            month_start = np.datetime64(f"{detected_year:04d}-{detected_month:02d}", 'M')
+            filtered_data = self._rows_between(_date_keys(month_start), _date_keys(month_start + 1))
+            period_info = f"{list(_MONTHS)[detected_month-1].title()} {detected_year}"
+            self._period_months[period_info] = (_month_keys(month_start), _month_keys(month_start + 1))
         elif detected_year:
             # Specific year
-            filtered_data = self.df[self.df['year'] == detected_year]
+            year_start = np.datetime64(f"{detected_year:04d}", 'Y')
+            filtered_data = self._rows_between(_date_keys(year_start), _date_keys(year_start + 1))
             period_info = f"Year {detected_year}"
+            self._period_months[period_info] = (_month_keys(year_start), _month_keys(year_start + 1))
         elif 'recent' in query_lower or 'lately' in query_lower:
             # Recent data
-            max_date = self.df['date'].max()
-            cutoff = max_date - pd.Timedelta(days=30)
-            filtered_data = self.df[self.df['date'] >= cutoff]
+            last_key = self._date_key_values[-1]
+            filtered_data = self._rows_between(last_key - 30, last_key + 1)
             period_info = "Last 30 days"
         else:
-            # All time
-            filtered_data = self.df.copy()
+            # All time; downstream code only reads, so the frame itself is shared instead of copied
+            filtered_data = self.df
             period_info = "All time"
 
         return filtered_data, period_info
@@ -350,8 +599,7 @@ class SpotifyDataQuery:
                 'period_info': period_info
             }
 
-        top_song = filtered_data['master_metadata_track_name'].value_counts().index[0]
-        play_count = filtered_data['master_metadata_track_name'].value_counts().iloc[0]
+        top_song, play_count = self._top_value(filtered_data, period_info, 'master_metadata_track_name')
         artist = filtered_data[filtered_data['master_metadata_track_name'] == top_song]['master_metadata_album_artist_name'].iloc[0]
 
         return {
@@ -383,15 +631,9 @@ class SpotifyDataQuery:
                 "period_info": period_info
             }
 
-        # Extract all genres from the period
-        all_genres = []
-        for genres_str in filtered_data["genres"]:
-            if genres_str and genres_str != "Unknown":
-                # Split genres and add to list
-                genres = [genre.strip() for genre in genres_str.split(",")]
-                all_genres.extend(genres)
+        genre_counts = self._genre_counts(filtered_data)
 
-        if not all_genres:
+        if genre_counts.empty:
             return {
                 "query": f"favorite genre in {period_info}",
                 "analysis_type": "favorite_genre", 
@@ -399,8 +641,6 @@ class SpotifyDataQuery:
                 "period_info": period_info
             }
 
-        # Count genres
-        genre_counts = pd.Series(all_genres).value_counts()
         top_genre = genre_counts.index[0]
         track_count = genre_counts.iloc[0]
 
@@ -430,8 +670,7 @@ class SpotifyDataQuery:
 
         # Get top song
         if 'song' in requested_types:
-            top_song = filtered_data['master_metadata_track_name'].value_counts().index[0]
-            song_count = filtered_data['master_metadata_track_name'].value_counts().iloc[0]
+            top_song, song_count = self._top_value(filtered_data, period_info, 'master_metadata_track_name')
             song_artist = filtered_data[filtered_data['master_metadata_track_name'] == top_song]['master_metadata_album_artist_name'].iloc[0]
             results['top_song'] = {
                 'name': top_song,
@@ -441,8 +680,7 @@ class SpotifyDataQuery:
 
         # Get top artist
         if 'artist' in requested_types:
-            top_artist = filtered_data['master_metadata_album_artist_name'].value_counts().index[0]
-            artist_count = filtered_data['master_metadata_album_artist_name'].value_counts().iloc[0]
+            top_artist, artist_count = self._top_value(filtered_data, period_info, 'master_metadata_album_artist_name')
             results['top_artist'] = {
                 'name': top_artist,
                 'plays': artist_count
@@ -450,14 +688,9 @@ class SpotifyDataQuery:
 
         # Get top genre
         if 'genre' in requested_types and 'genres' in filtered_data.columns:
-            all_genres = []
-            for genres_str in filtered_data['genres']:
-                if genres_str and genres_str != 'Unknown':
-                    genres = [genre.strip() for genre in genres_str.split(',')]
-                    all_genres.extend(genres)
-
-            if all_genres:
-                genre_counts = pd.Series(all_genres).value_counts()
+            genre_counts = self._genre_counts(filtered_data)
+
+            if not genre_counts.empty:
                 top_genre = genre_counts.index[0]
                 genre_count = genre_counts.iloc[0]
                 results['top_genre'] = {
@@ -472,8 +705,10 @@ class SpotifyDataQuery:
             'period_info': period_info
         }
 
-    def _generate_artist_name_variations(self, artist_name):
-        """Generate common variations of an artist name"""
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _generate_artist_name_variations(artist_name):
+        """Generate common variations of an artist name, lowercased, without duplicates or the name itself"""
         variations = []
         words = artist_name.split()
 
@@ -501,24 +736,15 @@ class SpotifyDataQuery:
             # Try with "The" prefix
             variations.append(f"The {word.capitalize()}")
 
-        return variations
+        # Matching is case-insensitive, so most variations collapse to the same lowercased string
+        lowered = dict.fromkeys(variation.lower() for variation in variations)
+        lowered.pop(artist_name.lower(), None)
+        return tuple(lowered)
 
     def _get_first_song_by_artist(self, filtered_data, period_info, artist_name):
         """Get the first song listened to by a specific artist"""
-        # Filter data for this artist - try multiple matching strategies
-        artist_data = filtered_data[
-            filtered_data['master_metadata_album_artist_name'].str.contains(artist_name, case=False, na=False)
-        ]
-
-        # If no exact match, try common name variations
-        if artist_data.empty:
-            variations = self._generate_artist_name_variations(artist_name)
-            for variation in variations:
-                artist_data = filtered_data[
-                    filtered_data['master_metadata_album_artist_name'].str.contains(variation, case=False, na=False)
-                ]
-                if not artist_data.empty:
-                    break
+        # Filter data for this artist, trying common name variations if needed
+        artist_data = self._artist_rows(filtered_data, artist_name)
 
         if artist_data.empty:
             return {
@@ -532,7 +758,7 @@ class SpotifyDataQuery:
         actual_artist_name = artist_data['master_metadata_album_artist_name'].iloc[0]
 
         # Find the earliest song by this artist
-        first_song = artist_data.loc[artist_data['ts'].idxmin()]
+        first_song = artist_data.iloc[0]
 
         return {
             'query': f'first {artist_name} song',
@@ -558,9 +784,7 @@ class SpotifyDataQuery:
             }
 
         # Filter data for this genre
-        genre_data = filtered_data[
-            filtered_data['genres'].str.contains(genre_name, case=False, na=False)
-        ]
+        genre_data = filtered_data[self._genre_mask(filtered_data, genre_name)]
 
         if genre_data.empty:
             return {
@@ -571,7 +795,7 @@ class SpotifyDataQuery:
             }
 
         # Find the earliest song in this genre
-        first_song = genre_data.loc[genre_data['ts'].idxmin()]
+        first_song = genre_data.iloc[0]
 
         return {
             'query': f'first {genre_name} song',
@@ -589,20 +813,8 @@ class SpotifyDataQuery:
 
     def _get_last_song_by_artist(self, filtered_data, period_info, artist_name):
         """Get the last song listened to by a specific artist"""
-        # Filter data for this artist - try multiple matching strategies
-        artist_data = filtered_data[
-            filtered_data['master_metadata_album_artist_name'].str.contains(artist_name, case=False, na=False)
-        ]
-
-        # If no exact match, try common name variations
-        if artist_data.empty:
-            variations = self._generate_artist_name_variations(artist_name)
-            for variation in variations:
-                artist_data = filtered_data[
-                    filtered_data['master_metadata_album_artist_name'].str.contains(variation, case=False, na=False)
-                ]
-                if not artist_data.empty:
-                    break
+        # Filter data for this artist, trying common name variations if needed
+        artist_data = self._artist_rows(filtered_data, artist_name)
 
         if artist_data.empty:
             return {
@@ -616,7 +828,7 @@ class SpotifyDataQuery:
         actual_artist_name = artist_data['master_metadata_album_artist_name'].iloc[0]
 
         # Find the latest song by this artist
-        last_song = artist_data.loc[artist_data['ts'].idxmax()]
+        last_song = artist_data.iloc[-1]
 
         return {
             'query': f'last {artist_name} song',
@@ -642,9 +854,7 @@ class SpotifyDataQuery:
             }
 
         # Filter data for this genre
-        genre_data = filtered_data[
-            filtered_data['genres'].str.contains(genre_name, case=False, na=False)
-        ]
+        genre_data = filtered_data[self._genre_mask(filtered_data, genre_name)]
 
         if genre_data.empty:
             return {
@@ -655,7 +865,7 @@ class SpotifyDataQuery:
             }
 
         # Find the latest song in this genre
-        last_song = genre_data.loc[genre_data['ts'].idxmax()]
+        last_song = genre_data.iloc[-1]
 
         return {
             'query': f'last {genre_name} song',
@@ -673,21 +883,8 @@ class SpotifyDataQuery:
 
     def _get_artist_songs(self, filtered_data, period_info, artist_name):
         """Get top songs for a specific artist"""
-        # Filter data for this artist - try multiple matching strategies
-        artist_data = filtered_data[
-            filtered_data['master_metadata_album_artist_name'].str.contains(artist_name, case=False, na=False)
-        ]
-
-        # If no exact match, try common name variations
-        if artist_data.empty:
-            variations = self._generate_artist_name_variations(artist_name)
-
-            for variation in variations:
-                artist_data = filtered_data[
-                    filtered_data['master_metadata_album_artist_name'].str.contains(variation, case=False, na=False)
-                ]
-                if not artist_data.empty:
-                    break
+        # Filter data for this artist, trying common name variations if needed
+        artist_data = self._artist_rows(filtered_data, artist_name)
 
         if artist_data.empty:
             return {
@@ -701,7 +898,7 @@ class SpotifyDataQuery:
         actual_artist_name = artist_data['master_metadata_album_artist_name'].iloc[0]
 
         # Get top songs for this artist
-        top_songs = artist_data['master_metadata_track_name'].value_counts().head(10).to_dict()
+        top_songs = _top_value_counts(artist_data['master_metadata_track_name'], 10)
 
         return {
             'query': f'{artist_name} songs in {period_info}',
@@ -710,7 +907,7 @@ class SpotifyDataQuery:
                 'artist': actual_artist_name,
                 'top_songs': top_songs,
                 'total_plays': len(artist_data),
-                'total_hours': artist_data['hours_played'].sum() if 'hours_played' in artist_data.columns else 0
+                'total_hours': _hours_played(artist_data)
             },
             'period_info': period_info
         }
@@ -720,19 +917,20 @@ class SpotifyDataQuery:
         if data.empty or "genres" not in data.columns:
             return {}
 
-        all_genres = []
-        for genres_str in data["genres"]:
-            if genres_str and genres_str != "Unknown":
-                genres = [genre.strip() for genre in genres_str.split(",")]
-                all_genres.extend(genres)
-
-        if not all_genres:
-            return {}
-
-        return pd.Series(all_genres).value_counts().head(limit).to_dict()
+        return self._genre_counts(data).head(limit).to_dict()
 
     def _get_daily_listening(self, filtered_data, period_info):
-        """Get detailed listening info for a specific day/period"""
+        """Get detailed listening info for a specific day/period, memoized per period"""
+        result = self._listening_cache.get(period_info)
+        if result is None:
+            result = self._listening_summary(filtered_data, period_info)
+            if len(self._listening_cache) >= LISTENING_CACHE_SIZE:
+                self._listening_cache.pop(next(iter(self._listening_cache)))
+            self._listening_cache[period_info] = result
+        return result
+
+    def _listening_summary(self, filtered_data, period_info):
+        """Build the listening info for a day (chronological tracks) or a longer period (summary stats)"""
         if filtered_data.empty:
             return {
                 "query": f"listening on {period_info}",
@@ -742,10 +940,11 @@ class SpotifyDataQuery:
             }
 
         # If its a single day, show chronological order
-        if len(filtered_data["date"].unique()) == 1:
-            daily_tracks = filtered_data.sort_values("ts")
+        days = filtered_data["date_key"].to_numpy()
+        if days[0] == days[-1]:
+            # Rows are already in chronological order
             tracks_list = []
-            for _, track in daily_tracks.iterrows():
+            for _, track in filtered_data.iterrows():
                 tracks_list.append({
                     "time": track["ts"].strftime("%H:%M"),
                     "song": track["master_metadata_track_name"],
@@ -758,31 +957,37 @@ class SpotifyDataQuery:
                 "data": {
                     "date": period_info,
                     "total_tracks": len(filtered_data),
-                    "total_hours": filtered_data["hours_played"].sum(),
+                    "total_hours": _hours_played(filtered_data),
                     "tracks_chronological": tracks_list[:20],  # Limit to first 20
-                    "top_artist_that_day": filtered_data["master_metadata_album_artist_name"].value_counts().index[0],
-                    "most_played_song": filtered_data["master_metadata_track_name"].value_counts().index[0]
+                    "top_artist_that_day": self._top_value(filtered_data, period_info, "master_metadata_album_artist_name")[0],
+                    "most_played_song": self._top_value(filtered_data, period_info, "master_metadata_track_name")[0]
                 },
                 "period_info": period_info
             }
         else:
             # Multiple days - show summary
+            peak_hour, peak_day = self._peak_times(filtered_data)
+            # One histogram per column feeds both the unique count and the top 5
+            artists = filtered_data["master_metadata_album_artist_name"]
+            songs = filtered_data["master_metadata_track_name"]
+            artist_counts = _code_counts(artists)
+            song_counts = _code_counts(songs)
             return {
                 "query": f"listening in {period_info}",
                 "analysis_type": "period_summary",
                 "data": {
                     "stats": {
                         "total_plays": len(filtered_data),
-                        "total_hours": filtered_data["hours_played"].sum(),
-                        "unique_artists": filtered_data["master_metadata_album_artist_name"].nunique(),
-                        "unique_songs": filtered_data["master_metadata_track_name"].nunique()
+                        "total_hours": _hours_played(filtered_data),
+                        "unique_artists": np.count_nonzero(artist_counts),
+                        "unique_songs": np.count_nonzero(song_counts)
                     },
-                    "top_artists": filtered_data["master_metadata_album_artist_name"].value_counts().head(5).to_dict(),
-                    "top_songs": filtered_data["master_metadata_track_name"].value_counts().head(5).to_dict(),
+                    "top_artists": _top_code_counts(artists.cat.categories, artist_counts, 5),
+                    "top_songs": _top_code_counts(songs.cat.categories, song_counts, 5),
                     "top_genres": self._extract_top_genres(filtered_data, 5),
                     "time_patterns": {
-                        "peak_listening_hour": filtered_data.groupby(filtered_data["ts"].dt.hour).size().idxmax() if not filtered_data.empty else 0,
-                        "peak_listening_day": filtered_data.groupby(filtered_data["ts"].dt.day_name()).size().idxmax() if not filtered_data.empty else "Unknown"
+                        "peak_listening_hour": peak_hour,
+                        "peak_listening_day": peak_day
                     }
                 },
                 "period_info": period_info
@@ -0,0 +1,55 @@
+import json
+import sys
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+# Newest first, as the enriched file is stored: an API timestamp (milliseconds) ahead of export ones
+MIXED_TS = ['2024-05-01T10:00:00.123Z', '2020-01-01T10:00:00Z', '2019-06-30T23:59:59Z']
+
+
+def _plays():
+    return [
+        {'ts': ts, 'ms_played': 200000, 'master_metadata_track_name': f'Song {i}',
+         'master_metadata_album_artist_name': 'Artist', 'genres': 'pop'}
+        for i, ts in enumerate(MIXED_TS)
+    ]
+
+
+def _expected_ts():
+    return list(pd.to_datetime(MIXED_TS, format='ISO8601'))
+
+
+def test_load_plays_writes_parquet_copy_from_mixed_timestamps(tmp_path, monkeypatch):
+    import spotify_data_query
+
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'data').mkdir()
+    (tmp_path / spotify_data_query.DATA_FILE).write_text(json.dumps(_plays()))
+
+    df = spotify_data_query._load_plays()
+
+    assert list(df['ts']) == _expected_ts()
+    stored = pd.read_parquet(tmp_path / spotify_data_query.PARQUET_FILE)
+    assert list(stored['ts']) == _expected_ts()
+
+
+def test_save_parquet_copy_from_mixed_timestamps(tmp_path, monkeypatch):
+    pytest.importorskip('spotipy')
+    # update_recent_tracks swaps in its own streamlit stand-in on import; keep it out of other tests
+    original = sys.modules.get('streamlit')
+    import update_recent_tracks
+    if original is None:
+        sys.modules.pop('streamlit', None)
+    else:
+        sys.modules['streamlit'] = original
+
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'data').mkdir()
+
+    update_recent_tracks.save_parquet_copy(pd.DataFrame(_plays()))
+
+    stored = pd.read_parquet(tmp_path / update_recent_tracks.PARQUET_FILE)
+    assert list(stored['ts']) == _expected_ts()
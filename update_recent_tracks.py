@@ -4,7 +4,6 @@ Auto-update script to fetch recent tracks from Spotify API
 and append them to enriched_spotify_data.json with genres and artwork
 """
 
-import json
 import os
 import sys
 import pandas as pd
@@ -27,6 +26,8 @@ class MockStreamlit:
 sys.modules['streamlit'] = MockStreamlit()
 
 from spotify_api import SpotifyAPI
+from data_builder import load_json_file, save_json_file
+from spotify_data_query import PARQUET_FILE, PYARROW_AVAILABLE
 
 def load_existing_data():
     """Load existing enriched data, download from release if missing"""
@@ -59,13 +60,20 @@ def load_existing_data():
 
     # Load existing file
     try:
-        with open(data_file, 'r') as f:
-            data = json.load(f)
-        return pd.DataFrame(data)
+        return pd.DataFrame(load_json_file(data_file))
     except Exception as e:
         print(f"❌ Error loading enriched data: {e}")
         return pd.DataFrame()
 
+def save_parquet_copy(df):
+    """Write the typed Parquet copy the query engine loads, so it doesn't have to re-parse the JSON"""
+    if not PYARROW_AVAILABLE:
+        return
+    try:
+        df.assign(ts=pd.to_datetime(df['ts'], format='ISO8601')).to_parquet(PARQUET_FILE, index=False)
+    except Exception as e:
+        print(f"⚠️  Could not write {PARQUET_FILE}: {e}")
+
 def fetch_recent_tracks():
     """Fetch recent 50 tracks from Spotify API"""
     print("🎵 Fetching recent tracks from Spotify API...")
@@ -106,14 +114,24 @@ def enrich_tracks(df, api):
     """Enrich tracks with genres"""
     print("🎨 Enriching tracks with genres...")
 
-    # Get unique artists
-    unique_artists = df['master_metadata_album_artist_name'].unique()
+    # Get unique artists, with the Spotify ids the recently played response carries
+    artists = df['master_metadata_album_artist_name']
+    ids = df['artist_id'] if 'artist_id' in df.columns else pd.Series(None, index=df.index)
+    artist_ids = dict(zip(artists, ids))
+
+    # Fetch genres for all artists in batched requests
+    artist_genres = api.get_artists_genres(artist_ids)
+    genre_map = {}
+    for i, artist in enumerate(artist_ids):
+        genres = artist_genres.get(artist)
+        genre_map[artist] = ', '.join(genres) if genres else 'Unknown'
+        print(f"  [{i+1}/{len(artist_ids)}] {artist}: {genre_map[artist]}")
+
+    # One lookup pass over the rows instead of a full-column comparison per artist
+    df['genres'] = artists.map(genre_map)
 
-    # Fetch genres for each artist
-    for i, artist in enumerate(unique_artists):
-        genres = api.get_artist_genres(artist)
-        df.loc[df['master_metadata_album_artist_name'] == artist, 'genres'] = ', '.join(genres) if genres else 'Unknown'
-        print(f"  [{i+1}/{len(unique_artists)}] {artist}: {', '.join(genres) if genres else 'Unknown'}")
+    # The ids were only needed for the lookup; keep them out of the enriched dataset
+    df = df.drop(columns='artist_id', errors='ignore')
 
     # Save genre cache
     api.genre_cache.save_cache()
@@ -130,16 +148,13 @@ def remove_duplicates(existing_df, new_df):
     if existing_df.empty:
         return new_df
 
-    # Create a key for deduplication using ONLY timestamp
+    # Deduplicate using ONLY the timestamp, compared as stored (both sides are ISO strings)
     # This way, only exact duplicate API fetches are filtered, not repeated song plays
-    existing_df['dedup_key'] = existing_df['ts'].astype(str)
-    new_df['dedup_key'] = new_df['ts'].astype(str)
+    is_new = ~new_df['ts'].isin(existing_df['ts'])
 
-    # Filter out only exact timestamp matches (duplicate API fetches)
-    new_tracks = new_df[~new_df['dedup_key'].isin(existing_df['dedup_key'])].copy()
-
-    # Drop the dedup key
-    new_tracks = new_tracks.drop('dedup_key', axis=1)
+    # Filter out only exact timestamp matches (duplicate API fetches); nothing is copied when none match.
+    # The result is only read afterwards, so the selection needs no defensive copy.
+    new_tracks = new_df if is_new.all() else new_df[is_new]
 
     filtered_count = len(new_df) - len(new_tracks)
     if filtered_count > 0:
@@ -161,21 +176,25 @@ def update_enriched_data(new_tracks_df):
         print("✅ No new tracks to add. Data is up to date!")
         return False
 
+    # Sort by timestamp (newest first)
+    new_tracks_df = new_tracks_df.sort_values('ts', ascending=False)
+
     # Combine datasets
     if existing_df.empty:
-        combined_df = new_tracks_df
+        combined_df = new_tracks_df.reset_index(drop=True)
+    elif existing_df['ts'].is_monotonic_decreasing and new_tracks_df['ts'].iloc[-1] > existing_df['ts'].iloc[0]:
+        # The stored history is already newest first and the new plays are all later, so they go on top
+        combined_df = pd.concat([new_tracks_df, existing_df], ignore_index=True)
     else:
         combined_df = pd.concat([existing_df, new_tracks_df], ignore_index=True)
-
-    # Sort by timestamp (newest first)
-    combined_df = combined_df.sort_values('ts', ascending=False).reset_index(drop=True)
+        combined_df = combined_df.sort_values('ts', ascending=False).reset_index(drop=True)
 
     # Save to file
     print(f"💾 Saving {len(combined_df)} total tracks to enriched_spotify_data.json...")
-    combined_data = combined_df.to_dict('records')
+    save_json_file('data/enriched_spotify_data.json', combined_df.to_dict('records'))
 
-    with open('data/enriched_spotify_data.json', 'w') as f:
-        json.dump(combined_data, f)
+    # Written after the JSON, so its newer mtime marks it as up to date
+    save_parquet_copy(combined_df)
 
     print(f"✅ Successfully added {len(new_tracks_df)} new tracks!")
     print(f"📈 Total tracks in dataset: {len(combined_df)}")